@@ -7,3 +7,8 @@ class ApiConfig(AppConfig):
     """API-конфиг для приложения api."""
 
     name = 'api'
+
+    def ready(self):
+        """Подключение сигналов приложения и учёта соединений с БД."""
+        from . import signals  # noqa: F401
+        from foodgram import db  # noqa: F401
@@ -0,0 +1,69 @@
+"""
+Асинхронные обёртки для эндпоинтов чтения.
+
+DRF не поддерживает асинхронные вьюсеты, поэтому вьюсет целиком
+(запросы к БД, сериализация и рендеринг) выполняется в пуле потоков,
+а поток событий ASGI-сервера в это время обслуживает других клиентов.
+Медленный клиент не занимает воркер: ответ отдаётся ему из цикла событий.
+"""
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import re_path
+
+from foodgram.db import check_connections, release_connections
+
+ASYNC_READ_ROUTES = (
+    'recipes-list',
+    'recipes-detail',
+    'tags-list',
+    'tags-detail',
+    'ingredients-list',
+    'ingredients-detail',
+    'users-subscriptions',
+)
+
+
+def run_view(view, request, *args, **kwargs):
+    """
+    Синхронная часть обработки запроса.
+
+    Проверяет и закрывает соединения с БД в том же потоке,
+    где они открывались. Обёртки SQL-запросов middleware приходят
+    в поток вместе с контекстом (foodgram.middleware.current_wrappers).
+    """
+    check_connections()
+    try:
+        return view(request, *args, **kwargs)
+    finally:
+        close_old_connections()
+        release_connections()
+
+
+def async_view(view):
+    """Асинхронная версия синхронной вьюхи."""
+    run = sync_to_async(run_view, thread_sensitive=False)
+
+    async def wrapper(request, *args, **kwargs):
+        return await run(view, request, *args, **kwargs)
+
+    wrapper.csrf_exempt = getattr(view, 'csrf_exempt', False)
+    wrapper.cls = getattr(view, 'cls', None)
+    return wrapper
+
+
+def async_urlpatterns(urlpatterns):
+    """
+    Маршруты с асинхронными вьюхами для ASYNC_READ_ROUTES.
+
+    Остальные маршруты возвращаются как есть, порядок сохраняется:
+    действия списка (recipes/download_shopping_cart/) остаются
+    перед recipes/{pk}/.
+    """
+    return [
+        re_path(
+            str(pattern.pattern), async_view(pattern.callback),
+            name=pattern.name
+        )
+        if pattern.name in ASYNC_READ_ROUTES else pattern
+        for pattern in urlpatterns
+    ]
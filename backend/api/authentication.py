@@ -0,0 +1,48 @@
+"""Аутентификация для приложения api."""
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+from foodgram.caches import is_shared
+from foodgram.metrics import record_cache
+
+TOKEN_CACHE_KEY = 'auth-token:{}'
+
+
+def get_token_cache():
+    """Кэш, в котором хранятся соответствия токен -> пользователь."""
+    return caches[settings.TOKEN_CACHE_ALIAS]
+
+
+def invalidate_token(key):
+    """Удаление токена из кэша."""
+    get_token_cache().delete(TOKEN_CACHE_KEY.format(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кэшированием.
+
+    Полностью повторяет TokenAuthentication, но найденный токен
+    вместе с пользователем кладётся в кэш на TOKEN_CACHE_TIMEOUT секунд,
+    поэтому при попадании в кэш запрос к БД не выполняется.
+    Кэш сбрасывается сигналами из api.signals при удалении токена
+    (выход через djoser) и при сохранении пользователя
+    (смена пароля, деактивация). Сброс виден всем воркерам только
+    в общем кэше, поэтому с кэшем в памяти процесса (LocMemCache)
+    токен каждый раз ищется в БД, как в TokenAuthentication.
+    """
+
+    def authenticate_credentials(self, key):
+        """Метод поиска пользователя по токену."""
+        if not is_shared(settings.TOKEN_CACHE_ALIAS):
+            return super().authenticate_credentials(key)
+        cache = get_token_cache()
+        cache_key = TOKEN_CACHE_KEY.format(key)
+        token = cache.get(cache_key)
+        record_cache('auth_token', token is not None)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, token, settings.TOKEN_CACHE_TIMEOUT)
+            return user, token
+        return token.user, token
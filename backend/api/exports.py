@@ -0,0 +1,164 @@
+"""
+Потоковая выгрузка данных пользователя в NDJSON и CSV.
+
+Рецепты пользователя (с тегами и ингредиентами), избранное и список
+покупок читаются через QuerySet.iterator(chunk_size) и отдаются
+кусками: теги и ингредиенты догружаются двумя запросами на каждую
+пачку рецептов, как prefetch_related, который iterator() в Django 3.2
+не поддерживает. В памяти одновременно находится только одна пачка,
+поэтому расход памяти не зависит от числа рецептов.
+
+На PostgreSQL iterator() читает через серверный курсор. При
+DISABLE_SERVER_SIDE_CURSORS (pgbouncer в режиме transaction) драйвер
+получает весь результат запроса сразу.
+"""
+import csv
+from io import StringIO
+from itertools import islice
+
+from rest_framework.renderers import BaseRenderer
+
+from .renderers import FastJSONRenderer
+from .representations import image_storage, recipe_ingredients, recipe_tags
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+EXPORT_RECIPE_FIELDS = ('id', 'name', 'text', 'cooking_time', 'image')
+CSV_COLUMNS = (
+    'type', 'id', 'name', 'cooking_time', 'tags', 'ingredients', 'image',
+    'text',
+)
+
+
+def chunks(iterable, size):
+    """Списки по size элементов из iterable."""
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def export_image_url(request, name):
+    """URL изображения: абсолютный в ответе API, относительный в команде."""
+    if not name:
+        return None
+    url = image_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
+
+
+def recipe_records(user, chunk_size, request=None):
+    """Рецепты автора с тегами и ингредиентами, пачками по chunk_size."""
+    for rows in chunks(
+        Recipe.objects.filter(author=user).order_by('id').values(
+            *EXPORT_RECIPE_FIELDS
+        ).iterator(chunk_size=chunk_size),
+        chunk_size
+    ):
+        ids = [row['id'] for row in rows]
+        tags = recipe_tags(ids)
+        ingredients = recipe_ingredients(ids)
+        yield [
+            {
+                'type': 'recipe',
+                **row,
+                'image': export_image_url(request, row['image']),
+                'tags': tags[row['id']],
+                'ingredients': ingredients[row['id']],
+            }
+            for row in rows
+        ]
+
+
+def user_recipe_records(model, record_type, user, chunk_size):
+    """Рецепты из избранного или списка покупок, пачками по chunk_size."""
+    return (
+        [
+            {'type': record_type, 'id': pk, 'name': name}
+            for pk, name in rows
+        ]
+        for rows in chunks(
+            model.objects.filter(user=user).order_by('id').values_list(
+                'recipe_id', 'recipe__name'
+            ).iterator(chunk_size=chunk_size),
+            chunk_size
+        )
+    )
+
+
+def export_records(user, chunk_size, request=None):
+    """Все данные пользователя для выгрузки, пачками записей."""
+    yield from recipe_records(user, chunk_size, request)
+    yield from user_recipe_records(Favorite, 'favorite', user, chunk_size)
+    yield from user_recipe_records(
+        ShoppingCart, 'shopping_cart', user, chunk_size
+    )
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Выгрузка в NDJSON: одна запись JSON на строку."""
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b''.join(self.stream([[data]]))
+
+    def stream(self, batches):
+        """Тело ответа кусками, по одному на пачку записей."""
+        renderer = FastJSONRenderer()
+        for records in batches:
+            yield b''.join(
+                renderer.render(record) + b'\n' for record in records
+            )
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Выгрузка в CSV: одна строка на запись.
+
+    Теги перечисляются через запятую, ингредиенты - через точку
+    с запятой в виде «название - количество единица».
+    """
+
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(data.keys())
+        writer.writerow(data.values())
+        return buffer.getvalue().encode(self.charset)
+
+    @staticmethod
+    def row(record):
+        """Строка CSV из записи выгрузки."""
+        return (
+            record['type'],
+            record['id'],
+            record['name'],
+            record.get('cooking_time', ''),
+            ', '.join(tag['name'] for tag in record.get('tags', ())),
+            '; '.join(
+                f'{ingredient["name"]} - {ingredient["amount"]} '
+                f'{ingredient["measurement_unit"]}'
+                for ingredient in record.get('ingredients', ())
+            ),
+            record.get('image') or '',
+            record.get('text', ''),
+        )
+
+    def stream(self, batches):
+        """Заголовок и строки CSV кусками, по одному на пачку записей."""
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        for records in batches:
+            writer.writerows(self.row(record) for record in records)
+            yield buffer.getvalue().encode(self.charset)
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode(self.charset)
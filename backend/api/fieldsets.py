@@ -0,0 +1,53 @@
+"""
+Выбор полей ответа параметрами ?fields= и ?omit=.
+
+?fields=id,name отдаёт только перечисленные поля, ?omit=text убирает
+поля из ответа по умолчанию. Связи и флаги пользователя, которых нет
+в ответе, не читаются из БД (api.representations, api.read_models).
+Неизвестное поле - ошибка 400, а не молча пустой ответ.
+"""
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse(request, param):
+    """Множество имён полей из параметра param или None."""
+    value = request.query_params.get(param, '')
+    names = {name.strip() for name in value.split(',')} - {''}
+    return names or None
+
+
+def requested_fields(request, available, default=None):
+    """
+    Поля ответа в порядке available.
+
+    default - поля без параметра ?fields=, по умолчанию все.
+    """
+    fields = parse(request, FIELDS_PARAM)
+    omit = parse(request, OMIT_PARAM) or set()
+    unknown = ((fields or set()) | omit) - set(available)
+    if unknown:
+        raise ValidationError({
+            'errors': f'Неизвестные поля: {", ".join(sorted(unknown))}.'
+        })
+    selected = fields or set(default or available)
+    return tuple(
+        field for field in available
+        if field in selected and field not in omit
+    )
+
+
+class SparseFieldsMixin:
+    """Сериализатор только с полями из context['fields'], если они есть."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get('fields')
+        if selected is None:
+            return fields
+        return {
+            name: field for name, field in fields.items()
+            if name in selected
+        }
@@ -0,0 +1,86 @@
+"""Микробенчмарк кодирования ответов API в JSON."""
+import json
+import timeit
+from io import BytesIO
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONParser, FastJSONRenderer, orjson
+from api.serializers import IngredientSerializer, ListRecipeSerializer
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    """
+    Сравнение JSONRenderer/JSONParser DRF с FastJSONRenderer/FastJSONParser.
+
+    Полезная нагрузка - страница списка рецептов и полный список
+    ингредиентов, сериализованные текущими сериализаторами. Перед
+    замером проверяется, что оба рендерера выдают одинаковые байты.
+    """
+
+    help = 'Микробенчмарк рендереров и парсеров JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Число рецептов в списке.'
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def payloads(self, recipes):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = AnonymousUser()
+        context = {'request': request}
+        return {
+            'recipes': ListRecipeSerializer(
+                Recipe.objects.all()[:recipes], many=True, context=context
+            ).data,
+            'ingredients': IngredientSerializer(
+                Ingredient.objects.all(), many=True, context=context
+            ).data,
+        }
+
+    def compare(self, baseline, fast, repeat):
+        """Лучшее время из repeat запусков для DRF и orjson, мс."""
+        drf, fast = (
+            min(timeit.repeat(function, number=1, repeat=repeat)) * 1000
+            for function in (baseline, fast)
+        )
+        return {
+            'drf': round(drf, 3),
+            'orjson': round(fast, 3),
+            'speedup': round(drf / fast, 1),
+        }
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson не установлен.')
+        renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        parser, fast_parser = JSONParser(), FastJSONParser()
+        repeat = options['repeat']
+        results = {}
+        for name, data in self.payloads(options['recipes']).items():
+            content = renderer.render(data)
+            if fast_renderer.render(data) != content:
+                raise CommandError(f'{name}: вывод рендереров различается.')
+            results[name] = {
+                'items': len(data),
+                'bytes': len(content),
+                'render_ms': self.compare(
+                    lambda: renderer.render(data),
+                    lambda: fast_renderer.render(data),
+                    repeat,
+                ),
+                'parse_ms': self.compare(
+                    lambda: parser.parse(BytesIO(content)),
+                    lambda: fast_parser.parse(BytesIO(content)),
+                    repeat,
+                ),
+            }
+        self.stdout.write(json.dumps(results, indent=2))
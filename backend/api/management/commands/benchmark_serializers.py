@@ -0,0 +1,130 @@
+"""Сверка и сравнение сериализаторов с api.representations."""
+import json
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.read_models import read_recipe, read_recipe_list
+from api.renderers import FastJSONRenderer
+from api.representations import (RECIPE_FIELDS, USER_FIELDS, ingredient_list,
+                                 recipe_detail, recipe_list, subscription_list)
+from api.serializers import (IngredientSerializer, ListRecipeSerializer,
+                             SubscribeSerializer)
+from foodgram.metrics import QueryCounter
+from recipes.models import Ingredient, Recipe, User
+
+
+class Command(BaseCommand):
+    """
+    Проверка, что быстрый путь чтения выдаёт тот же JSON.
+
+    Для страницы рецептов, одного рецепта, страницы подписок и списка
+    ингредиентов сравнивает байты ответа сериализаторов DRF
+    и api.representations (рецепты - и api.read_models), затем время
+    и число SQL-запросов обоих вариантов.
+    """
+
+    help = 'Сверка и сравнение быстрого пути чтения с сериализаторами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Число рецептов на странице.'
+        )
+        parser.add_argument(
+            '--user', help='email пользователя, от имени которого читать.'
+        )
+        parser.add_argument('--recipes-limit', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def get_request(self, options):
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+        else:
+            user = User.objects.filter(follower__isnull=False).first()
+        if user is None:
+            raise CommandError('Нет пользователя с подписками.')
+        request = Request(APIRequestFactory().get(
+            '/api/users/subscriptions/',
+            {'recipes_limit': options['recipes_limit']}
+        ))
+        request.user = user
+        return request
+
+    def cases(self, request, options):
+        context = {'request': request}
+        recipes = Recipe.objects.all()[:options['recipes']]
+        authors = User.objects.filter(following__following=request.user)
+        ingredients = Ingredient.objects.all()
+        detail = Recipe.objects.values_list('id', flat=True).first()
+        return {
+            'recipes': (
+                lambda: ListRecipeSerializer(
+                    recipes.all(), many=True, context=context
+                ).data,
+                lambda: recipe_list(recipes.values(*RECIPE_FIELDS), request),
+            ),
+            'detail': (
+                lambda: ListRecipeSerializer(
+                    Recipe.objects.get(pk=detail), context=context
+                ).data,
+                lambda: recipe_detail(detail, request),
+            ),
+            'read_model': (
+                lambda: ListRecipeSerializer(
+                    recipes.all(), many=True, context=context
+                ).data,
+                lambda: read_recipe_list(
+                    list(recipes.values_list('id', flat=True)), request
+                ),
+            ),
+            'read_model_detail': (
+                lambda: ListRecipeSerializer(
+                    Recipe.objects.get(pk=detail), context=context
+                ).data,
+                lambda: read_recipe(detail, request),
+            ),
+            'subscriptions': (
+                lambda: SubscribeSerializer(
+                    authors.all(), many=True, context=context
+                ).data,
+                lambda: subscription_list(
+                    authors.values(*USER_FIELDS), request
+                ),
+            ),
+            'ingredients': (
+                lambda: IngredientSerializer(
+                    ingredients.all(), many=True
+                ).data,
+                lambda: ingredient_list(ingredients),
+            ),
+        }
+
+    def measure(self, function, repeat):
+        """Лучшее время (мс) и число SQL-запросов одного вызова."""
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            function()
+        best = min(timeit.repeat(function, number=1, repeat=repeat))
+        return {'ms': round(best * 1000, 2), 'queries': counter.queries}
+
+    def handle(self, *args, **options):
+        request = self.get_request(options)
+        renderer = FastJSONRenderer()
+        results = {}
+        for name, (serializer, fast) in self.cases(request, options).items():
+            content = renderer.render(serializer())
+            if renderer.render(fast()) != content:
+                raise CommandError(f'{name}: JSON различается.')
+            drf = self.measure(serializer, options['repeat'])
+            values = self.measure(fast, options['repeat'])
+            results[name] = {
+                'bytes': len(content),
+                'serializer': drf,
+                'values': values,
+                'speedup': round(drf['ms'] / values['ms'], 1),
+            }
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,51 @@
+"""Команда потоковой выгрузки данных пользователя."""
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import CSVRenderer, NDJSONRenderer, export_records
+from recipes.models import User
+
+RENDERERS = {
+    renderer.format: renderer for renderer in (NDJSONRenderer, CSVRenderer)
+}
+
+
+class Command(BaseCommand):
+    """
+    Выгрузка рецептов, избранного и списка покупок пользователя.
+
+    Пишет то же, что эндпоинт users/me/export/, в файл или stdout,
+    пачками, не загружая все данные в память.
+    """
+
+    help = 'Выгружает данные пользователя в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='email пользователя.')
+        parser.add_argument(
+            '--format', choices=tuple(RENDERERS), default='ndjson'
+        )
+        parser.add_argument(
+            '--output', help='Путь к файлу, по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+            help='Число рецептов в одной пачке.'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options['email']).first()
+        if user is None:
+            raise CommandError(f'Пользователь {options["email"]} не найден.')
+        content = RENDERERS[options['format']]().stream(
+            export_records(user, options['chunk_size'])
+        )
+        if options['output'] is None:
+            for chunk in content:
+                sys.stdout.buffer.write(chunk)
+            return
+        with open(options['output'], 'wb') as output:
+            for chunk in content:
+                output.write(chunk)
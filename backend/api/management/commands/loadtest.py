@@ -0,0 +1,367 @@
+"""
+Команда нагрузочного тестирования API.
+
+Пример:
+    python manage.py loadtest --start-server --seed-users 20 \
+        --concurrency 16 --duration 60 --output loadtest.json
+
+Запущенный командой сервер работает без лимитов запросов
+(THROTTLE_ENABLED=False), иначе все клиенты с одного адреса быстро
+получают 429. Ответы не 2xx/3xx считаются ошибками и не входят
+в перцентили задержки.
+
+Сравнение WSGI и ASGI при большом числе одновременных клиентов:
+    python manage.py loadtest --start-server --server gunicorn \
+        --concurrency 64 --output wsgi.json
+    python manage.py loadtest --start-server --server uvicorn \
+        --concurrency 64 --output asgi.json
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag, User
+from users.models import Subscribe
+
+SERVERS = {
+    'gunicorn': ('gunicorn', 'foodgram.wsgi:application', '--bind'),
+    'uvicorn': ('uvicorn', 'foodgram.asgi:application', '--host'),
+}
+DEFAULT_MIX = (
+    'browse=40,tags=15,ingredients=15,toggle=15,subscriptions=10,download=5'
+)
+# Рецепты в корзине каждого тестового пользователя для сценария download.
+CART_SIZE = 5
+
+
+def percentile(values, rank):
+    """Перцентиль методом ближайшего ранга по отсортированному списку."""
+    if not values:
+        return None
+    index = max(0, int(round(rank / 100 * len(values))) - 1)
+    return round(values[index] * 1000, 2)
+
+
+def is_success(status):
+    """Успешный ответ: 2xx или 3xx."""
+    return 200 <= status < 400
+
+
+def parse_mix(value):
+    """Разбор строки вида browse=40,tags=15 в словарь весов."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in Scenarios.names:
+            raise CommandError(f'Неизвестный сценарий: {name}')
+        mix[name] = float(weight)
+    return mix
+
+
+class Scenarios:
+    """
+    Сценарии поведения клиентов.
+
+    Каждый сценарий выполняет один или несколько запросов
+    через client.request(label, method, path, token).
+    """
+
+    names = (
+        'browse', 'tags', 'ingredients', 'toggle', 'subscriptions', 'download'
+    )
+
+    def __init__(self, data, rng):
+        self.data = data
+        self.rng = rng
+
+    def browse(self, client):
+        page = self.rng.randint(1, 3)
+        client.request('recipes-list', 'GET', f'/api/recipes/?page={page}')
+        recipe = self.rng.choice(self.data['recipes'])
+        client.request('recipes-detail', 'GET', f'/api/recipes/{recipe}/')
+
+    def tags(self, client):
+        slug = self.rng.choice(self.data['tags'])
+        client.request('recipes-tags', 'GET', f'/api/recipes/?tags={slug}')
+
+    def ingredients(self, client):
+        prefix = self.rng.choice(self.data['prefixes'])
+        client.request(
+            'ingredients-search', 'GET', f'/api/ingredients/?name={prefix}'
+        )
+
+    def toggle(self, client):
+        # Рецепты из корзин тестовых пользователей не трогаются:
+        # иначе download скачивал бы пустой список покупок.
+        token = self.rng.choice(self.data['tokens'])
+        recipe = self.rng.choice(self.data['toggle_recipes'])
+        target = self.rng.choice(('favorite', 'shopping_cart'))
+        path = f'/api/recipes/{recipe}/{target}/'
+        client.request(f'{target}-add', 'POST', path, token)
+        client.request(f'{target}-remove', 'DELETE', path, token)
+
+    def subscriptions(self, client):
+        token = self.rng.choice(self.data['tokens'])
+        client.request(
+            'subscriptions', 'GET',
+            '/api/users/subscriptions/?recipes_limit=3', token
+        )
+
+    def download(self, client):
+        token = self.rng.choice(self.data['tokens'])
+        client.request(
+            'download-shopping-cart', 'GET',
+            '/api/recipes/download_shopping_cart/', token
+        )
+
+
+class Client:
+    """HTTP-клиент одного потока с записью результатов."""
+
+    def __init__(self, url, results, lock):
+        parts = urlsplit(url)
+        self.connection = HTTPConnection(parts.hostname, parts.port or 80)
+        self.results = results
+        self.lock = lock
+
+    def request(self, label, method, path, token=None):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, ConnectionError):
+            self.connection.close()
+            status = 0
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.results[label].append((elapsed, status))
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест с реалистичной смесью запросов Foodgram.
+
+    Просмотр рецептов, фильтр по тегам, поиск ингредиентов,
+    избранное/корзина, подписки и скачивание списка покупок.
+    Результат: пропускная способность и p50/p95/p99 по эндпоинтам в JSON.
+    """
+
+    help = 'Нагрузочный тест API с отчётом в формате JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--start-server', action='store_true',
+            help='Запустить сервер приложения на время теста.'
+        )
+        parser.add_argument(
+            '--server', choices=SERVERS, default='gunicorn',
+            help='gunicorn (foodgram.wsgi) или uvicorn (foodgram.asgi).'
+        )
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--duration', type=float, default=30, help='Секунды.'
+        )
+        parser.add_argument('--mix', default=DEFAULT_MIX)
+        parser.add_argument(
+            '--seed-users', type=int, default=10,
+            help='Сколько тестовых пользователей с токенами создать.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--keep-throttles', action='store_true',
+            help='Не отключать лимиты запросов у запущенного сервера.'
+        )
+        parser.add_argument('--output', help='Файл для отчёта.')
+
+    def seed_users(self, count, cart):
+        """Создание тестовых пользователей, токенов, подписок и корзин."""
+        authors = list(
+            Recipe.objects.values_list('author_id', flat=True).distinct()[:5]
+        )
+        tokens = []
+        for number in range(count):
+            user, _ = User.objects.get_or_create(
+                email=f'loadtest{number}@example.com',
+                defaults={
+                    'username': f'loadtest{number}',
+                    'first_name': 'Load',
+                    'last_name': 'Test',
+                }
+            )
+            tokens.append(Token.objects.get_or_create(user=user)[0].key)
+            Subscribe.objects.bulk_create(
+                [
+                    Subscribe(following=user, author_id=author)
+                    for author in authors if author != user.id
+                ],
+                ignore_conflicts=True
+            )
+            ShoppingCart.objects.bulk_create(
+                [ShoppingCart(user=user, recipe_id=recipe) for recipe in cart],
+                ignore_conflicts=True
+            )
+        return tokens
+
+    def load_data(self, options):
+        """Справочные данные для сценариев."""
+        recipes = list(
+            Recipe.objects.order_by('id').values_list('id', flat=True)
+        )
+        cart = recipes[:CART_SIZE]
+        data = {
+            'recipes': recipes,
+            'toggle_recipes': recipes[CART_SIZE:] or recipes,
+            # Фильтр tags принимает только теги, у которых есть рецепты.
+            'tags': list(
+                Tag.objects.filter(recipe__isnull=False)
+                .values_list('slug', flat=True).distinct()
+            ),
+            'prefixes': sorted({
+                name[:2] for name in
+                Ingredient.objects.values_list('name', flat=True)[:500]
+            }),
+            'tokens': self.seed_users(options['seed_users'], cart),
+        }
+        for key, values in data.items():
+            if not values:
+                raise CommandError(f'Нет данных для сценариев: {key}.')
+        return data
+
+    def start_server(self, options):
+        """Запуск gunicorn или uvicorn и ожидание готовности."""
+        parts = urlsplit(options['url'])
+        module, application, bind = SERVERS[options['server']]
+        if module == 'uvicorn':
+            address = [bind, parts.hostname, '--port', str(parts.port or 80)]
+        else:
+            address = [bind, f'{parts.hostname}:{parts.port or 80}']
+        env = os.environ.copy()
+        if not options['keep_throttles']:
+            env['THROTTLE_ENABLED'] = 'False'
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', module, application, *address,
+                '--workers', str(options['workers']),
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+        for _ in range(100):
+            try:
+                connection = HTTPConnection(parts.hostname, parts.port or 80)
+                connection.request('GET', '/api/tags/')
+                connection.getresponse().read()
+                return server
+            except OSError:
+                time.sleep(0.1)
+        server.terminate()
+        raise CommandError('Сервер не запустился.')
+
+    def run_clients(self, options, data):
+        """Запуск потоков-клиентов на заданное время."""
+        mix = parse_mix(options['mix'])
+        names, weights = list(mix), list(mix.values())
+        results = defaultdict(list)
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['duration']
+
+        def worker(number):
+            rng = random.Random(options['seed'] + number)
+            scenarios = Scenarios(data, rng)
+            client = Client(options['url'], results, lock)
+            while time.monotonic() < deadline:
+                getattr(scenarios, rng.choices(names, weights)[0])(client)
+
+        threads = [
+            threading.Thread(target=worker, args=(number,))
+            for number in range(options['concurrency'])
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, time.monotonic() - started
+
+    def report(self, options, results, elapsed):
+        """Сводка результатов по эндпоинтам."""
+        endpoints = {}
+        statuses = Counter()
+        for label, samples in sorted(results.items()):
+            latencies = sorted(
+                latency for latency, status in samples if is_success(status)
+            )
+            counts = Counter(str(status) for _, status in samples)
+            statuses.update(counts)
+            endpoints[label] = {
+                'requests': len(samples),
+                'errors': len(samples) - len(latencies),
+                'statuses': dict(sorted(counts.items())),
+                'rps': round(len(samples) / elapsed, 2),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+            }
+        total = sum(len(samples) for samples in results.values())
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'config': {
+                key: options[key] for key in
+                (
+                    'url', 'server', 'workers', 'concurrency', 'duration',
+                    'mix', 'seed', 'keep_throttles',
+                )
+            },
+            'elapsed_s': round(elapsed, 2),
+            'requests': total,
+            'rps': round(total / elapsed, 2),
+            'errors': sum(
+                count for status, count in statuses.items()
+                if not is_success(int(status))
+            ),
+            'statuses': dict(sorted(statuses.items())),
+            'endpoints': endpoints,
+        }
+
+    def handle(self, *args, **options):
+        data = self.load_data(options)
+        server = None
+        if options['start_server']:
+            server = self.start_server(options)
+        try:
+            results, elapsed = self.run_clients(options, data)
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+        report = json.dumps(
+            self.report(options, results, elapsed),
+            ensure_ascii=False, indent=2
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(report)
+        self.stdout.write(report)
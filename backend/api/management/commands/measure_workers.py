@@ -0,0 +1,126 @@
+"""Команда измерения времени запуска и памяти воркеров gunicorn."""
+import json
+import os
+import subprocess
+import sys
+import time
+from http.client import HTTPConnection
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def read_memory(pid):
+    """RSS и PSS процесса в мегабайтах (Linux, /proc)."""
+    memory = {}
+    for path, fields in (
+        (f'/proc/{pid}/status', {'VmRSS:': 'rss_mb'}),
+        (f'/proc/{pid}/smaps_rollup', {'Pss:': 'pss_mb'}),
+    ):
+        try:
+            with open(path) as proc:
+                for line in proc:
+                    name, *values = line.split()
+                    if name in fields:
+                        memory[fields[name]] = round(int(values[0]) / 1024, 1)
+        except OSError:
+            continue
+    return memory
+
+
+def child_pids(pid):
+    """Дочерние процессы (воркеры) мастер-процесса gunicorn."""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as proc:
+            return [int(child) for child in proc.read().split()]
+    except OSError:
+        return []
+
+
+class Command(BaseCommand):
+    """
+    Измерение времени запуска и памяти на воркер gunicorn.
+
+    Запускает gunicorn с gunicorn.conf.py, замеряет время до первого
+    ответа, прогревает воркеры и выводит RSS/PSS мастера и воркеров.
+    PSS учитывает общую (copy-on-write) память, поэтому по нему
+    видно, сколько экономит preload_app.
+    """
+
+    help = 'Время запуска и память воркеров gunicorn в формате JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--worker-class', default='gthread')
+        parser.add_argument(
+            '--compare-preload', action='store_true',
+            help='Сделать замер с preload_app и без него.'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=50,
+            help='Сколько запросов отправить перед замером памяти.'
+        )
+
+    def request(self, port, path):
+        connection = HTTPConnection('127.0.0.1', port, timeout=10)
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    def wait_ready(self, server, port):
+        """Ожидание первого успешного ответа."""
+        started = time.perf_counter()
+        while time.perf_counter() - started < 60:
+            if server.poll() is not None:
+                raise CommandError('gunicorn завершился при запуске.')
+            try:
+                self.request(port, '/api/tags/')
+                return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.05)
+        raise CommandError('gunicorn не ответил за 60 секунд.')
+
+    def measure(self, options, preload):
+        env = {
+            **os.environ,
+            'GUNICORN_BIND': f'127.0.0.1:{options["port"]}',
+            'GUNICORN_WORKERS': str(options['workers']),
+            'GUNICORN_THREADS': str(options['threads']),
+            'GUNICORN_WORKER_CLASS': options['worker_class'],
+            'GUNICORN_PRELOAD': str(preload),
+        }
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', 'foodgram.wsgi:application',
+                '-c', 'gunicorn.conf.py',
+            ],
+            cwd=settings.BASE_DIR, env=env,
+        )
+        try:
+            startup = self.wait_ready(server, options['port'])
+            while len(child_pids(server.pid)) < options['workers']:
+                time.sleep(0.05)
+            for _ in range(options['warmup']):
+                self.request(options['port'], '/api/recipes/')
+                self.request(options['port'], '/api/ingredients/')
+            workers = [read_memory(pid) for pid in child_pids(server.pid)]
+            return {
+                'preload_app': preload,
+                'startup_s': round(startup, 3),
+                'master': read_memory(server.pid),
+                'workers': workers,
+                'total_pss_mb': round(
+                    sum(worker.get('pss_mb', 0) for worker in workers), 1
+                ),
+            }
+        finally:
+            server.terminate()
+            server.wait()
+
+    def handle(self, *args, **options):
+        modes = (True, False) if options['compare_preload'] else (True,)
+        results = [self.measure(options, preload) for preload in modes]
+        self.stdout.write(json.dumps(results, indent=2))
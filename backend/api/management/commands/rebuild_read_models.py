@@ -0,0 +1,31 @@
+"""Команда полной пересборки представлений рецептов."""
+from django.core.management.base import BaseCommand
+
+from api.read_models import rebuild_now
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Пересборка RecipeReadModel для всех рецептов.
+
+    Нужна после миграции, loaddata и массовых изменений через
+    QuerySet.update() или bulk_create(), которые не вызывают
+    сигналов. Каждая пачка рецептов пересобирается в своей транзакции.
+    """
+
+    help = 'Пересобирает готовые представления всех рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Число рецептов в одной транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        ids = list(Recipe.objects.order_by('id').values_list('id', flat=True))
+        size = options['batch_size']
+        rebuilt = 0
+        for start in range(0, len(ids), size):
+            rebuilt += rebuild_now(ids[start:start + size])
+        self.stdout.write(f'Пересобрано представлений: {rebuilt}.')
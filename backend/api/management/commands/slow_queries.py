@@ -0,0 +1,77 @@
+"""Команда вывода самых медленных SQL-запросов."""
+import json
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Сводка журнала медленных запросов.
+
+    Группирует записи foodgram.slow_queries по форме запроса
+    и выводит самые затратные по суммарному времени вместе с планом.
+    """
+
+    help = 'Выводит самые медленные формы SQL-запросов с планами EXPLAIN.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Количество выводимых запросов.'
+        )
+        parser.add_argument(
+            '--log', default=settings.SLOW_QUERY_LOG,
+            help='Путь к журналу медленных запросов.'
+        )
+
+    def read_log(self, path):
+        """Чтение журнала и группировка записей по форме запроса."""
+        shapes = defaultdict(lambda: {
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'sql': '', 'plan': None, 'origins': Counter(),
+        })
+        try:
+            with open(path, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    shape = shapes[entry['fingerprint']]
+                    if entry['type'] == 'explain':
+                        shape['plan'] = entry['plan']
+                        continue
+                    shape['count'] += 1
+                    duration = entry['duration_ms']
+                    shape['total_ms'] += duration
+                    shape['max_ms'] = max(shape['max_ms'], duration)
+                    shape['sql'] = entry['sql']
+                    shape['origins'][
+                        f'{entry["route"]} / {entry["origin"]}'
+                    ] += 1
+        except FileNotFoundError as error:
+            raise CommandError(f'Журнал {path} не найден.') from error
+        return shapes
+
+    def handle(self, *args, **options):
+        shapes = self.read_log(options['log'])
+        top = sorted(
+            (shape for shape in shapes.values() if shape['count']),
+            key=lambda shape: shape['total_ms'],
+            reverse=True,
+        )[:options['top']]
+        for number, shape in enumerate(top, start=1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{number}. всего {shape["total_ms"]:.1f} мс, '
+                f'запросов {shape["count"]}, '
+                f'среднее {shape["total_ms"] / shape["count"]:.1f} мс, '
+                f'максимум {shape["max_ms"]:.1f} мс'
+            ))
+            self.stdout.write(shape['sql'])
+            for origin, count in shape['origins'].most_common(3):
+                self.stdout.write(f'  {count} x {origin}')
+            if shape['plan']:
+                self.stdout.write(shape['plan'])
+            self.stdout.write('')
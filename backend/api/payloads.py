@@ -0,0 +1,119 @@
+"""
+Предварительно сжатые ответы для почти неизменных списков.
+
+Полные списки тегов и ингредиентов меняются только из админки, поэтому
+их JSON рендерится и сжимается (gzip и, если установлен пакет brotli,
+br) один раз и хранится в кэше вместе с хэшем содержимого. ETag
+строится из хэша: он одинаков во всех воркерах и после истечения
+кэша и меняется только вместе с содержимым, поэтому повторный запрос
+с If-None-Match получает 304. Сигналы из api.signals после коммита
+изменения Tag или Ingredient удаляют сжатые тела из кэша, и следующий
+запрос собирает их заново.
+
+Изменения через QuerySet.update() и bulk_create() сигналов не вызывают:
+такие данные, как и данные в локальном кэше отдельных воркеров
+(LocMemCache), обновляются через PAYLOAD_CACHE_TIMEOUT секунд.
+"""
+import gzip
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from .renderers import FastJSONRenderer
+from foodgram.metrics import record_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PAYLOAD_KEY = 'payload:{}'
+
+
+def invalidate_payload(name):
+    """Удаление сжатых тел списка после коммита изменения данных."""
+    transaction.on_commit(lambda: cache.delete(PAYLOAD_KEY.format(name)))
+
+
+def content_hash(content):
+    """Хэш тела ответа для ETag."""
+    return hashlib.blake2b(content, digest_size=12).hexdigest()
+
+
+def compress(content):
+    """Тело ответа во всех поддерживаемых кодировках."""
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as gzip_file:
+        gzip_file.write(content)
+    bodies = {'identity': content, 'gzip': buffer.getvalue()}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(content)
+    return bodies
+
+
+def choose_encoding(accept_encoding, bodies):
+    """Кодировка ответа по заголовку Accept-Encoding."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in ('br', 'gzip'):
+        if coding in bodies and accepted.get(
+            coding, accepted.get('*', 0)
+        ) > 0:
+            return coding
+    return 'identity'
+
+
+def precompressed_response(request, name, build):
+    """
+    Ответ со списком из кэша сжатых тел.
+
+    build() возвращает данные списка, он вызывается только при
+    промахе кэша. Браузерный интерфейс DRF получает обычный Response.
+    """
+    if request.accepted_renderer.format != 'json':
+        return Response(build())
+    key = PAYLOAD_KEY.format(name)
+    payload = cache.get(key)
+    record_cache('payload', payload is not None)
+    if payload is None:
+        content = FastJSONRenderer().render(build())
+        payload = {'hash': content_hash(content), 'bodies': compress(content)}
+        cache.set(key, payload, settings.PAYLOAD_CACHE_TIMEOUT)
+    bodies = payload['bodies']
+    encoding = choose_encoding(
+        request.META.get('HTTP_ACCEPT_ENCODING', ''), bodies
+    )
+    etag = f'"{name}-{payload["hash"]}-{encoding}"'
+    etags = parse_etags(
+        request.META.get('HTTP_IF_NONE_MATCH', '').replace('W/', '')
+    )
+    if etag in etags or '*' in etags:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(
+            bodies[encoding], content_type='application/json'
+        )
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Cache-Control'] = (
+        f'public, max-age={settings.PAYLOAD_CACHE_MAX_AGE}'
+    )
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,289 @@
+"""
+Денормализованные представления рецептов (RecipeReadModel).
+
+Рецепты читают намного чаще, чем меняют, поэтому ответ
+ListRecipeSerializer для анонимного пользователя хранится готовым
+в RecipeReadModel. При чтении к нему добавляются флаги текущего
+пользователя (подписка, избранное, корзина) и абсолютный URL
+изображения - всё одним запросом на страницу.
+
+Представления пересобираются сигналами из api.signals в той же
+транзакции, что и изменение рецепта, его ингредиентов или тегов.
+Внутри deferred_rebuild() пересборка откладывается до выхода
+из блока и выполняется один раз для всех затронутых рецептов.
+Изменение тега, ингредиента или автора пересобирает представления
+его рецептов в той же транзакции, если их не больше
+READ_MODEL_SYNC_LIMIT. Если рецептов больше, их пересобирают фоновые
+задачи rebuild_read_models (приложение jobs), поставленные в той же
+транзакции: до выполнения задач воркером такие рецепты отдаются
+со старым названием тега, ингредиента или именем автора.
+QuerySet.update(), bulk_create() и loaddata сигналов не вызывают:
+после них нужна команда manage.py rebuild_read_models.
+Рецепты без представления отдаются через api.representations.
+Из представления читаются только ключи, нужные для полей ответа.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models import Exists, F, Func, JSONField, OuterRef
+from django.db.transaction import atomic
+
+from .representations import (INGREDIENT_FIELDS, RECIPE_FIELDS,
+                              RECIPE_LIST_FIELDS, TAG_FIELDS, USER_FIELDS,
+                              image_url, recipe_detail, recipe_ingredients,
+                              recipe_list, recipe_tags)
+from jobs.queue import enqueue
+from recipes.models import (Favorite, Recipe, RecipeReadModel, ShoppingCart,
+                            User)
+from users.models import Subscribe
+
+INGREDIENT_AMOUNT_FIELDS = INGREDIENT_FIELDS + ('amount',)
+READ_MODEL_KEYS = (
+    'id', 'tags', 'author', 'ingredients', 'image', 'name', 'text',
+    'cooking_time',
+)
+
+pending = ContextVar('pending_read_models', default=None)
+deleting = ContextVar('deleting_recipes', default=frozenset())
+
+
+def build(recipes):
+    """Несохранённые RecipeReadModel для рецептов с id из recipes."""
+    rows = list(Recipe.objects.filter(id__in=recipes).values(*RECIPE_FIELDS))
+    ids = [row['id'] for row in rows]
+    users = {
+        row['id']: row for row in User.objects.filter(
+            id__in={row['author_id'] for row in rows}
+        ).values(*USER_FIELDS)
+    }
+    tags = recipe_tags(ids)
+    ingredients = recipe_ingredients(ids)
+    return [
+        RecipeReadModel(recipe_id=row['id'], data={
+            'id': row['id'],
+            'tags': tags[row['id']],
+            'author': users[row['author_id']],
+            'ingredients': ingredients[row['id']],
+            'image': row['image'],
+            'name': row['name'],
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        })
+        for row in rows
+    ]
+
+
+class JSONKeys(Func):
+    """Объект JSON только с ключами keys из JSON-поля."""
+
+    def __init__(self, field, keys):
+        super().__init__(field, output_field=JSONField())
+        self.keys = keys
+
+    def pairs(self, compiler, value):
+        field, field_params = compiler.compile(self.source_expressions[0])
+        sql, params = [], []
+        for key in self.keys:
+            sql.append(f'%s, {value.format(field)}')
+            params += [key, *field_params, key]
+        return ', '.join(sql), params
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # json_extract отдаёт объекты и массивы с подтипом JSON,
+        # и json_object вставляет их как JSON, а не как строки.
+        sql, params = self.pairs(compiler, "json_extract({}, '$.' || %s)")
+        return f'json_object({sql})', params
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = self.pairs(compiler, '{} -> %s')
+        return f'jsonb_build_object({sql})', params
+
+
+def read_model_keys(fields):
+    """Ключи представления для полей ответа fields."""
+    return tuple(
+        key for key in READ_MODEL_KEYS if key == 'id' or key in fields
+    )
+
+
+@atomic
+def rebuild_now(recipes):
+    """Пересборка представлений рецептов с id из recipes."""
+    recipes = set(recipes) - deleting.get()
+    if not recipes:
+        return 0
+    RecipeReadModel.objects.filter(recipe_id__in=recipes).delete()
+    return len(RecipeReadModel.objects.bulk_create(build(recipes)))
+
+
+def rebuild(recipes):
+    """
+    Пересборка представлений после изменения рецептов.
+
+    Внутри deferred_rebuild() id только запоминаются.
+    """
+    collected = pending.get()
+    if collected is None:
+        rebuild_now(recipes)
+    else:
+        collected.update(recipes)
+
+
+def rebuild_later(recipes):
+    """Пересборка представлений рецептов фоновыми задачами."""
+    recipes = sorted(set(recipes))
+    size = settings.READ_MODEL_JOB_SIZE
+    for start in range(0, len(recipes), size):
+        enqueue('rebuild_read_models', recipes=recipes[start:start + size])
+
+
+def rebuild_affected(recipes):
+    """
+    Пересборка представлений после изменения тега, ингредиента или автора.
+
+    До READ_MODEL_SYNC_LIMIT рецептов - через rebuild() в той же
+    транзакции, больше - фоновыми задачами.
+    """
+    recipes = set(recipes)
+    if len(recipes) > settings.READ_MODEL_SYNC_LIMIT:
+        rebuild_later(recipes)
+    else:
+        rebuild(recipes)
+
+
+@contextmanager
+def deferred_rebuild():
+    """Одна пересборка для всех изменений рецептов внутри блока."""
+    if pending.get() is not None:
+        yield
+        return
+    collected = set()
+    token = pending.set(collected)
+    try:
+        yield
+    finally:
+        pending.reset(token)
+    rebuild_now(collected)
+
+
+def deletion_started(recipe_id):
+    """
+    Начало каскадного удаления рецепта (сигнал pre_delete).
+
+    Пока рецепт удаляется, удаление его ингредиентов не должно
+    пересобирать представление, которое удаляется вместе с ним.
+    """
+    deleting.set(deleting.get() | {recipe_id})
+
+
+def deletion_finished(recipe_id):
+    """Рецепт удалён (сигнал post_delete)."""
+    deleting.set(deleting.get() - {recipe_id})
+
+
+def user_flags(user, fields):
+    """Подзапросы флагов пользователя, нужных для полей fields."""
+    flags = {}
+    if user.is_anonymous:
+        return flags
+    if 'author' in fields:
+        flags['is_subscribed'] = Exists(Subscribe.objects.filter(
+            following=user, author_id=OuterRef('recipe__author_id')
+        ))
+    if 'is_favorited' in fields:
+        flags['is_favorited'] = Exists(Favorite.objects.filter(
+            user=user, recipe_id=OuterRef('recipe_id')
+        ))
+    if 'is_in_shopping_cart' in fields:
+        flags['is_in_shopping_cart'] = Exists(ShoppingCart.objects.filter(
+            user=user, recipe_id=OuterRef('recipe_id')
+        ))
+    return flags
+
+
+def with_user_flags(queryset, user, fields=RECIPE_LIST_FIELDS):
+    """
+    Представления с флагами подписки, избранного и корзины.
+
+    Подзапрос флага выполняется, только если его поле есть в fields.
+    Представление отдаётся в recipe_data только с ключами для fields.
+    """
+    flags = user_flags(user, fields)
+    keys = read_model_keys(fields)
+    data = F('data') if keys == READ_MODEL_KEYS else JSONKeys('data', keys)
+    return queryset.annotate(**flags).values(*flags, recipe_data=data)
+
+
+def value(request, field, data):
+    """Значение поля field ответа из представления data."""
+    if field == 'tags':
+        return [
+            {name: tag[name] for name in TAG_FIELDS} for tag in data['tags']
+        ]
+    if field == 'author':
+        return {
+            **{name: data['author'][name] for name in USER_FIELDS},
+            'is_subscribed': data['is_subscribed'],
+        }
+    if field == 'ingredients':
+        return [
+            {name: ingredient[name] for name in INGREDIENT_AMOUNT_FIELDS}
+            for ingredient in data['ingredients']
+        ]
+    if field == 'image':
+        return image_url(request, data['image'])
+    return data[field]
+
+
+def representation(request, data, fields=RECIPE_LIST_FIELDS,
+                   is_subscribed=False, is_favorited=False,
+                   is_in_shopping_cart=False):
+    """
+    Ответ ListRecipeSerializer из сохранённого представления.
+
+    В ответ попадают только поля fields. jsonb в PostgreSQL
+    не сохраняет порядок ключей, поэтому словари собираются
+    заново в порядке полей сериализаторов.
+    """
+    data = {
+        **data,
+        'is_subscribed': is_subscribed,
+        'is_favorited': is_favorited,
+        'is_in_shopping_cart': is_in_shopping_cart,
+    }
+    return {field: value(request, field, data) for field in fields}
+
+
+def read_recipe_list(ids, request, fields=RECIPE_LIST_FIELDS):
+    """
+    Страница рецептов с id из ids, в том же порядке, с полями fields.
+
+    Рецепты без представления собираются через recipe_list.
+    """
+    found = {}
+    for row in with_user_flags(
+        RecipeReadModel.objects.filter(recipe_id__in=ids),
+        request.user, fields
+    ):
+        data = row.pop('recipe_data')
+        found[data['id']] = representation(request, data, fields, **row)
+    missing = [pk for pk in ids if pk not in found]
+    if missing:
+        rows = list(
+            Recipe.objects.filter(id__in=missing).values(*RECIPE_FIELDS)
+        )
+        for row, recipe in zip(rows, recipe_list(rows, request, fields)):
+            found[row['id']] = recipe
+    return [found[pk] for pk in ids if pk in found]
+
+
+def read_recipe(pk, request, fields=RECIPE_LIST_FIELDS):
+    """Один рецепт или None, без представления - через recipe_detail."""
+    row = with_user_flags(
+        RecipeReadModel.objects.filter(recipe_id=pk), request.user, fields
+    ).first()
+    if row is not None:
+        data = row.pop('recipe_data')
+        return representation(request, data, fields, **row)
+    return recipe_detail(pk, request, fields)
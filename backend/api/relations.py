@@ -0,0 +1,88 @@
+"""
+Добавление в избранное, список покупок и подписки одним запросом.
+
+На PostgreSQL проверка существования рецепта (автора), проверка
+уникальности и вставка выполняются одним
+INSERT ... SELECT ... WHERE EXISTS ... ON CONFLICT DO NOTHING RETURNING,
+этот же запрос возвращает строку для ответа. Пустой результат значит,
+что рецепта (автора) нет или связь уже есть: различить их нужно только
+на неуспешном пути, отдельным запросом во вьюсете.
+На остальных СУБД вьюсеты используют ORM.
+"""
+from django.db import connections, router
+
+from .representations import image_url, subscription_list
+from recipes.models import Recipe, User
+from users.models import Subscribe
+
+ADD_RECIPE_SQL = """
+WITH added AS (
+    INSERT INTO {table} (user_id, recipe_id)
+    SELECT %(user)s, %(recipe)s
+    WHERE EXISTS (SELECT 1 FROM {recipe} WHERE id = %(recipe)s)
+    ON CONFLICT DO NOTHING
+    RETURNING recipe_id
+)
+SELECT r.name, r.id, r.image, r.cooking_time
+FROM added JOIN {recipe} r ON r.id = added.recipe_id
+"""
+
+SUBSCRIBE_SQL = """
+WITH added AS (
+    INSERT INTO {subscribe} (following_id, author_id)
+    SELECT %(user)s, %(author)s
+    WHERE EXISTS (SELECT 1 FROM {user} WHERE id = %(author)s)
+    ON CONFLICT DO NOTHING
+    RETURNING author_id
+)
+SELECT u.email, u.id, u.first_name, u.last_name, u.username
+FROM added JOIN {user} u ON u.id = added.author_id
+"""
+
+
+def insert_connection(model):
+    """Соединение для записи model, если вставка одним запросом доступна."""
+    connection = connections[router.db_for_write(model)]
+    return connection if connection.vendor == 'postgresql' else None
+
+
+def fetch_row(connection, sql, params):
+    """Первая строка результата запроса словарём или None."""
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip((column.name for column in cursor.description), row))
+
+
+def add_recipe(connection, model, request, pk):
+    """
+    Добавление рецепта pk в избранное или список покупок.
+
+    Возвращает рецепт, как у RecipeShortShowSerializer,
+    или None, если рецепта нет или он уже добавлен.
+    """
+    recipe = fetch_row(connection, ADD_RECIPE_SQL.format(
+        table=model._meta.db_table,
+        recipe=Recipe._meta.db_table,
+    ), {'user': request.user.pk, 'recipe': pk})
+    if recipe is not None:
+        recipe['image'] = image_url(request, recipe['image'])
+    return recipe
+
+
+def add_subscription(connection, request, pk):
+    """
+    Подписка на автора pk.
+
+    Возвращает автора, как у SubscribeSerializer,
+    или None, если автора нет или подписка уже есть.
+    """
+    author = fetch_row(connection, SUBSCRIBE_SQL.format(
+        subscribe=Subscribe._meta.db_table,
+        user=User._meta.db_table,
+    ), {'user': request.user.pk, 'author': pk})
+    if author is None:
+        return None
+    return subscription_list([author], request)[0]
@@ -0,0 +1,68 @@
+"""
+Рендереры и парсеры JSON на orjson.
+
+orjson кодирует ответы в несколько раз быстрее стандартного json.
+Вывод совпадает с rest_framework.renderers.JSONRenderer: компактный
+JSON в UTF-8 с экранированными U+2028/U+2029, типы, которых orjson
+не знает (Decimal, ленивые строки, QuerySet), и даты кодируются так же,
+как в DRF. Без установленного orjson и для форматированного вывода
+(application/json; indent=4, браузерный интерфейс) используются
+стандартные классы DRF.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+    ORJSON_ERRORS = (orjson.JSONDecodeError, UnicodeDecodeError)
+
+default_encoder = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        if data is None:
+            return b''
+        ret = orjson.dumps(
+            data, default=default_encoder, option=ORJSON_OPTIONS
+        )
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029'
+            )
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except ORJSON_ERRORS as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
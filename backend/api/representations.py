@@ -0,0 +1,276 @@
+"""
+Быстрое представление списков для эндпоинтов чтения.
+
+Сериализаторы DRF создают дерево полей и вызывают to_representation
+для каждого поля каждой строки, а ListRecipeSerializer ещё и делает
+по несколько запросов на рецепт. Здесь словари ответа собираются
+напрямую из строк .values() и словарей, заполненных несколькими
+запросами на всю страницу. Результат совпадает с выводом
+ListRecipeSerializer, SubscribeSerializer и IngredientSerializer
+(сверяется командой manage.py benchmark_serializers).
+Запись по-прежнему идёт через сериализаторы.
+
+Один рецепт на PostgreSQL собирается целиком в базе одним запросом
+с json_build_object/json_agg (recipe_detail).
+"""
+from collections import defaultdict
+
+from django.db import connections, router
+
+from recipes.models import (Favorite, Ingredient, IngredientQuantity, Recipe,
+                            ShoppingCart, Tag, User)
+from users.models import Subscribe
+
+USER_FIELDS = ('email', 'id', 'first_name', 'last_name', 'username')
+TAG_FIELDS = ('id', 'name', 'slug', 'color')
+RECIPE_FIELDS = (
+    'id', 'author_id', 'image', 'name', 'text', 'cooking_time'
+)
+RECIPE_SHORT_FIELDS = ('author_id', 'name', 'id', 'image', 'cooking_time')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+RECIPE_LIST_FIELDS = (
+    'id', 'tags', 'author', 'ingredients', 'image', 'name', 'text',
+    'cooking_time', 'is_favorited', 'is_in_shopping_cart'
+)
+RECIPE_COMPACT_FIELDS = (
+    'id', 'tags', 'author', 'image', 'name', 'cooking_time',
+    'is_favorited', 'is_in_shopping_cart'
+)
+SUBSCRIPTION_FIELDS = USER_FIELDS + (
+    'is_subscribed', 'recipes', 'recipes_count'
+)
+
+image_storage = Recipe._meta.get_field('image').storage
+
+
+def project(representation, fields):
+    """Представление только с полями fields, в порядке fields."""
+    return {field: representation[field] for field in fields}
+
+
+def image_url(request, name):
+    """Абсолютный URL изображения, как у ImageField в DRF."""
+    if not name:
+        return None
+    return request.build_absolute_uri(image_storage.url(name))
+
+
+def subscribed_authors(user, authors):
+    """id авторов из authors, на которых подписан пользователь."""
+    if user.is_anonymous:
+        return set()
+    return set(
+        Subscribe.objects.filter(
+            following=user, author_id__in=authors
+        ).values_list('author_id', flat=True)
+    )
+
+
+def user_recipe_ids(model, user, recipes):
+    """id рецептов из recipes в избранном или корзине пользователя."""
+    if user.is_anonymous:
+        return set()
+    return set(
+        model.objects.filter(
+            user=user, recipe_id__in=recipes
+        ).values_list('recipe_id', flat=True)
+    )
+
+
+def recipe_tags(recipes):
+    """Теги рецептов: {id рецепта: [тег, ...]}."""
+    tags = defaultdict(list)
+    for row in Recipe.tags.through.objects.filter(
+        recipe_id__in=recipes
+    ).order_by(
+        *(f'tag__{field}' for field in Tag._meta.ordering)
+    ).values('recipe_id', *(f'tag__{field}' for field in TAG_FIELDS)):
+        tags[row['recipe_id']].append({
+            field: row[f'tag__{field}'] for field in TAG_FIELDS
+        })
+    return tags
+
+
+def recipe_ingredients(recipes):
+    """Ингредиенты рецептов: {id рецепта: [ингредиент, ...]}."""
+    ingredients = defaultdict(list)
+    for recipe, pk, name, unit, amount in IngredientQuantity.objects.filter(
+        current_recipe_id__in=recipes
+    ).order_by('id').values_list(
+        'current_recipe_id', 'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    ):
+        ingredients[recipe].append({
+            'id': pk,
+            'name': name,
+            'measurement_unit': unit,
+            'amount': amount,
+        })
+    return ingredients
+
+
+def recipe_list(rows, request, fields=RECIPE_LIST_FIELDS):
+    """
+    Представление страницы рецептов, как у ListRecipeSerializer.
+
+    rows - строки Recipe.objects.values(*RECIPE_FIELDS),
+    fields - поля ответа: связи, которых нет в fields, не читаются.
+    """
+    user = request.user
+    ids = [row['id'] for row in rows]
+    users = {}
+    if 'author' in fields:
+        authors = {row['author_id'] for row in rows}
+        subscribed = subscribed_authors(user, authors)
+        users = {
+            row['id']: {**row, 'is_subscribed': row['id'] in subscribed}
+            for row in User.objects.filter(
+                id__in=authors
+            ).values(*USER_FIELDS)
+        }
+    tags = recipe_tags(ids) if 'tags' in fields else {}
+    ingredients = (
+        recipe_ingredients(ids) if 'ingredients' in fields else {}
+    )
+    favorited = (
+        user_recipe_ids(Favorite, user, ids)
+        if 'is_favorited' in fields else set()
+    )
+    in_cart = (
+        user_recipe_ids(ShoppingCart, user, ids)
+        if 'is_in_shopping_cart' in fields else set()
+    )
+    return [
+        project({
+            'id': row['id'],
+            'tags': tags.get(row['id'], []),
+            'author': users.get(row['author_id']),
+            'ingredients': ingredients.get(row['id'], []),
+            'image': image_url(request, row['image']),
+            'name': row['name'],
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+            'is_favorited': row['id'] in favorited,
+            'is_in_shopping_cart': row['id'] in in_cart,
+        }, fields)
+        for row in rows
+    ]
+
+
+RECIPE_DETAIL_SQL = """
+SELECT json_build_object(
+    'id', r.id,
+    'tags', (
+        SELECT COALESCE(json_agg(json_build_object(
+            'id', t.id, 'name', t.name, 'slug', t.slug, 'color', t.color
+        ) ORDER BY t.name), '[]')
+        FROM {recipe_tags} rt JOIN {tag} t ON t.id = rt.tag_id
+        WHERE rt.recipe_id = r.id
+    ),
+    'author', json_build_object(
+        'email', u.email, 'id', u.id, 'first_name', u.first_name,
+        'last_name', u.last_name, 'username', u.username,
+        'is_subscribed', EXISTS(
+            SELECT 1 FROM {subscribe} s
+            WHERE s.author_id = u.id AND s.following_id = %(user)s
+        )
+    ),
+    'ingredients', (
+        SELECT COALESCE(json_agg(json_build_object(
+            'id', i.id, 'name', i.name,
+            'measurement_unit', i.measurement_unit, 'amount', iq.amount
+        ) ORDER BY iq.id), '[]')
+        FROM {quantity} iq JOIN {ingredient} i ON i.id = iq.ingredient_id
+        WHERE iq.current_recipe_id = r.id
+    ),
+    'image', r.image,
+    'name', r.name,
+    'text', r.text,
+    'cooking_time', r.cooking_time,
+    'is_favorited', EXISTS(
+        SELECT 1 FROM {favorite} f
+        WHERE f.recipe_id = r.id AND f.user_id = %(user)s
+    ),
+    'is_in_shopping_cart', EXISTS(
+        SELECT 1 FROM {cart} c
+        WHERE c.recipe_id = r.id AND c.user_id = %(user)s
+    )
+)
+FROM {recipe} r JOIN {user} u ON u.id = r.author_id
+WHERE r.id = %(recipe)s
+"""
+
+
+def recipe_detail_sql():
+    """Запрос RECIPE_DETAIL_SQL с именами таблиц моделей."""
+    return RECIPE_DETAIL_SQL.format(
+        recipe=Recipe._meta.db_table,
+        recipe_tags=Recipe.tags.through._meta.db_table,
+        tag=Tag._meta.db_table,
+        user=User._meta.db_table,
+        subscribe=Subscribe._meta.db_table,
+        quantity=IngredientQuantity._meta.db_table,
+        ingredient=Ingredient._meta.db_table,
+        favorite=Favorite._meta.db_table,
+        cart=ShoppingCart._meta.db_table,
+    )
+
+
+def recipe_detail(pk, request, fields=RECIPE_LIST_FIELDS):
+    """
+    Представление рецепта, как у ListRecipeSerializer, или None.
+
+    На PostgreSQL ответ целиком строит база, из Python остаётся
+    только сделать URL изображения абсолютным и оставить поля
+    fields. На остальных СУБД используется recipe_list.
+    """
+    connection = connections[router.db_for_read(Recipe)]
+    if connection.vendor != 'postgresql':
+        rows = list(Recipe.objects.filter(pk=pk).values(*RECIPE_FIELDS))
+        return recipe_list(rows, request, fields)[0] if rows else None
+    with connection.cursor() as cursor:
+        cursor.execute(recipe_detail_sql(), {
+            'recipe': pk,
+            'user': request.user.pk,
+        })
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    recipe = row[0]
+    recipe['image'] = image_url(request, recipe['image'])
+    return project(recipe, fields)
+
+
+def subscription_list(rows, request, fields=SUBSCRIPTION_FIELDS):
+    """
+    Представление страницы подписок, как у SubscribeSerializer.
+
+    rows - строки User.objects.values(*USER_FIELDS) авторов,
+    на которых подписан пользователь. Без recipes и recipes_count
+    в fields рецепты авторов не читаются.
+    """
+    recipes_limit = request.query_params.get('recipes_limit')
+    recipes_limit = int(recipes_limit) if recipes_limit else None
+    recipes = defaultdict(list)
+    if {'recipes', 'recipes_count'} & set(fields):
+        for recipe in Recipe.objects.filter(
+            author_id__in=[row['id'] for row in rows]
+        ).values(*RECIPE_SHORT_FIELDS):
+            recipes[recipe.pop('author_id')].append(recipe)
+    result = []
+    for row in rows:
+        author_recipes = recipes[row['id']]
+        for recipe in author_recipes[:recipes_limit]:
+            recipe['image'] = image_url(request, recipe['image'])
+        result.append(project({
+            **row,
+            'is_subscribed': True,
+            'recipes': author_recipes[:recipes_limit],
+            'recipes_count': len(author_recipes),
+        }, fields))
+    return result
+
+
+def ingredient_list(queryset):
+    """Представление списка ингредиентов, как у IngredientSerializer."""
+    return list(queryset.values(*INGREDIENT_FIELDS))
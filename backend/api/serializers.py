@@ -14,13 +14,20 @@ from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.serializers import ValidationError
 
+from .fieldsets import SparseFieldsMixin
+from .read_models import deferred_rebuild, rebuild
 from recipes.models import (Favorite, Ingredient, IngredientQuantity, Recipe,
                             ShoppingCart, Tag, User)
 from users.models import Subscribe
 
 
-class UserSerializer(serializers.ModelSerializer):
-    """Сериализатор пользователя."""
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Сериализатор пользователя.
+
+    Во вьюсете пользователей поля ответа ограничиваются
+    параметрами ?fields= и ?omit= (api.fieldsets).
+    """
 
     is_subscribed = serializers.SerializerMethodField()
 
@@ -38,10 +45,18 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj: User):
-        """Метод вывода данных о подписке."""
+        """
+        Метод вывода данных о подписке.
+
+        Использует аннотацию is_subscribed из queryset, если она есть.
+        """
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        if obj.pk == request.user.pk:
+            return False
         return Subscribe.objects.filter(
             following=request.user, author=obj).exists()
 
@@ -179,7 +194,9 @@ class ListRecipeSerializer(serializers.ModelSerializer):
     @staticmethod
     def get_ingredients(obj):
         """Метод получения ингредиента для вывода данных."""
-        ingredients = IngredientQuantity.objects.filter(current_recipe=obj)
+        ingredients = obj.ingredient_quantities.select_related(
+            'ingredient'
+        ).order_by('id')
         return IngredientQuantityShowSerializer(ingredients, many=True).data
 
     def get_is_favorited(self, obj):
@@ -230,9 +247,10 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
         """Метод для создания новых записей рецептов в БД."""
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(**validated_data)
-        self.create_ingredients(recipe, ingredients)
-        recipe.tags.set(tags)
+        with deferred_rebuild():
+            recipe = Recipe.objects.create(**validated_data)
+            self.create_ingredients(recipe, ingredients)
+            recipe.tags.set(tags)
         return recipe
 
     def create_ingredients(self, recipe, ingredients):
@@ -245,9 +263,67 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
             ) for ingredient in ingredients
         ])
 
+    def update_ingredients(self, recipe, ingredients):
+        """
+        Метод для обновления списка ингредиентов рецепта.
+
+        Сравнивает сохранённые пары (ингредиент, количество) с
+        переданными и изменяет только отличающиеся строки.
+        Возвращает True, если в БД что-то изменилось.
+        """
+        current = {
+            ingredient_id: (pk, amount)
+            for pk, ingredient_id, amount in IngredientQuantity.objects.filter(
+                current_recipe=recipe
+            ).values_list('id', 'ingredient_id', 'amount')
+        }
+        submitted = {
+            ingredient['ingredient'].id: ingredient
+            for ingredient in ingredients
+        }
+        removed = [
+            pk for ingredient_id, (pk, _) in current.items()
+            if ingredient_id not in submitted
+        ]
+        added = [
+            ingredient for ingredient_id, ingredient in submitted.items()
+            if ingredient_id not in current
+        ]
+        changed = [
+            IngredientQuantity(id=current[ingredient_id][0],
+                               amount=ingredient['amount'])
+            for ingredient_id, ingredient in submitted.items()
+            if ingredient_id in current
+            and current[ingredient_id][1] != ingredient['amount']
+        ]
+        if removed:
+            IngredientQuantity.objects.filter(id__in=removed).delete()
+        if changed:
+            IngredientQuantity.objects.bulk_update(changed, ('amount',))
+        if added:
+            self.create_ingredients(recipe, added)
+        return bool(removed or changed or added)
+
+    def update_tags(self, recipe, tags):
+        """
+        Метод для обновления тегов рецепта.
+
+        Добавляет и удаляет только изменившиеся связи.
+        Возвращает True, если в БД что-то изменилось.
+        """
+        current = set(recipe.tags.values_list('id', flat=True))
+        submitted = {tag.id for tag in tags}
+        if current == submitted:
+            return False
+        if current - submitted:
+            recipe.tags.remove(*(current - submitted))
+        if submitted - current:
+            recipe.tags.add(*(submitted - current))
+        return True
+
     def validate(self, data):
         """Валидация полей рецепта перед созданием экзмепляра."""
-        ingredients = self.initial_data.get('ingredients')
+        ingredients = self.initial_data.get('ingredients', [])
         ingredients_list = []
         for ingredient in ingredients:
             if ingredient['id'] in ingredients_list:
@@ -255,7 +331,7 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
                     'Нельзя добавлять один и тот же ингредиент дважды.'
                 )
             ingredients_list.append(ingredient['id'])
-        if data['cooking_time'] <= 0:
+        if data.get('cooking_time', 1) <= 0:
             raise ValidationError(
                 'Увы, но мгновенное приготовление блюда невозможно.'
             )
@@ -263,19 +339,36 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
 
     @atomic
     def update(self, instance, validated_data):
-        """Метод для обновления уже существующих рецептов в БД."""
-        instance.name = validated_data.get('name', instance.name)
-        instance.image = validated_data.get('image', instance.image)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time
-        )
-        if 'ingredients' in validated_data:
-            recipe = instance
-            ingredients = validated_data.pop('ingredients')
-            IngredientQuantity.objects.filter(current_recipe=recipe).delete()
-            self.create_ingredients(recipe, ingredients)
-        instance.save()
+        """
+        Метод для обновления уже существующих рецептов в БД.
+
+        Записываются только изменившиеся поля, ингредиенты и теги.
+        Строка рецепта (и сигнал post_save) затрагивается, только
+        если изменились её поля. Представление рецепта (RecipeReadModel)
+        пересобирается один раз в конце.
+        """
+        changed_fields = [
+            field for field in ('name', 'image', 'text', 'cooking_time')
+            if field in validated_data
+            and validated_data[field] != getattr(instance, field)
+        ]
+        for field in changed_fields:
+            setattr(instance, field, validated_data[field])
+        changed = False
+        with deferred_rebuild():
+            if 'ingredients' in validated_data:
+                changed |= self.update_ingredients(
+                    instance, validated_data.pop('ingredients')
+                )
+            if 'tags' in validated_data:
+                changed |= self.update_tags(
+                    instance, validated_data.pop('tags')
+                )
+            if changed_fields:
+                instance.save(update_fields=changed_fields)
+            elif changed:
+                # bulk_create и bulk_update не отправляют сигналов.
+                rebuild([instance.pk])
         return instance
 
     def to_representation(self, instance):
@@ -397,6 +490,20 @@ class SubscribeCreateSerializer(serializers.ModelSerializer):
         ).data
 
 
+class BatchIdsSerializer(serializers.Serializer):
+    """Десериализатор списка id для пакетных эндпоинтов."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+    def validate_ids(self, value):
+        """Метод удаления повторов с сохранением порядка."""
+        return list(dict.fromkeys(value))
+
+
 class ShoppingCartSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления/удаления рецептов из списка покупок."""
 
@@ -411,21 +518,6 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         model = ShoppingCart
         fields = ('id', 'name', 'image', 'cooking_time', 'user', 'recipe')
 
-    def validate(self, data):
-        """
-        Валидация данных при обработке запроса.
-
-        Проверяем, присутствует ли данный рецепт в списке покупок.
-        """
-        if ShoppingCart.objects.filter(
-            user=data['user'],
-            recipe=data['recipe']
-        ).exists():
-            raise serializers.ValidationError(
-                'Рецепт уже в списке покупок.'
-            )
-        return data
-
     def to_representation(self, instance):
         """Метод для вывода данных при GET-запросе."""
         request = self.context.get('request')
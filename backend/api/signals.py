@@ -0,0 +1,146 @@
+"""Сигналы приложения api."""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token
+from .payloads import invalidate_payload
+from .read_models import (deletion_finished, deletion_started, rebuild,
+                          rebuild_affected)
+from .representations import USER_FIELDS
+from recipes.models import Ingredient, IngredientQuantity, Recipe, Tag
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Сброс кэша токена при выходе пользователя (token/logout)."""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    """
+    Сброс кэша токенов при изменении пользователя.
+
+    Покрывает смену пароля и деактивацию. Изменения через
+    QuerySet.update() сигналов не вызывают и устаревают по TTL.
+    """
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ):
+        invalidate_token(key)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """Сброс кэшированного списка ингредиентов."""
+    invalidate_payload('ingredients')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    """Сброс кэшированного списка тегов."""
+    invalidate_payload('tags')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, raw=False, **kwargs):
+    """Пересборка представления сохранённого рецепта."""
+    if not raw:
+        rebuild([instance.pk])
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """Без пересборки представления во время удаления рецепта."""
+    deletion_started(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Конец удаления рецепта."""
+    deletion_finished(instance.pk)
+
+
+@receiver(post_save, sender=IngredientQuantity)
+@receiver(post_delete, sender=IngredientQuantity)
+def recipe_ingredient_changed(sender, instance, raw=False, **kwargs):
+    """Пересборка представления рецепта с изменённым ингредиентом."""
+    if not raw:
+        rebuild([instance.current_recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    """
+    Пересборка представлений после изменения тегов рецептов.
+
+    Со стороны тега (tag.recipe_set) затронутые рецепты при clear()
+    запоминаются до удаления связей.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            rebuild([instance.pk])
+    elif action == 'pre_clear':
+        instance.cleared_recipes = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        rebuild(instance.cleared_recipes)
+    elif action in ('post_add', 'post_remove'):
+        rebuild(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, raw=False, **kwargs):
+    """Пересборка представлений рецептов с изменённым тегом."""
+    if not raw:
+        rebuild_affected(instance.recipe_set.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    """Рецепты удаляемого тега, связи с ним удаляются без сигналов."""
+    instance.deleted_recipes = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    """Пересборка представлений рецептов удалённого тега."""
+    rebuild_affected(instance.deleted_recipes)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, raw=False, **kwargs):
+    """Пересборка представлений рецептов с изменённым ингредиентом."""
+    if not raw:
+        rebuild_affected(IngredientQuantity.objects.filter(
+            ingredient=instance
+        ).values_list('current_recipe_id', flat=True))
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, created, raw=False, update_fields=None,
+                 **kwargs):
+    """
+    Пересборка представлений рецептов автора.
+
+    Сохранения, не затрагивающие полей автора в ответе
+    (например, last_login при входе), пропускаются.
+    """
+    if created or raw:
+        return
+    if update_fields and not set(update_fields) & set(USER_FIELDS):
+        return
+    rebuild_affected(instance.recipes.values_list('id', flat=True))
@@ -0,0 +1,9 @@
+"""Фоновые задачи приложения api (выполняются воркером jobs)."""
+from .read_models import rebuild_now
+from jobs.queue import task
+
+
+@task('rebuild_read_models')
+def rebuild_read_models(recipes):
+    """Пересборка представлений рецептов с id из recipes."""
+    rebuild_now(recipes)
@@ -0,0 +1,153 @@
+"""
+Ограничение частоты и числа одновременных тяжёлых запросов.
+
+Троттлинг DRF хранит в кэше историю запросов и перезаписывает её
+через get/set, поэтому параллельные запросы одного клиента теряют
+друг друга. Здесь счётчик фиксированного окна увеличивается атомарно
+через cache.incr в кэше THROTTLE_CACHE_ALIAS. Лимит общий для всех
+воркеров только с общим кэшем (memcached в settings_production);
+с LocMemCache у каждого воркера свой счётчик, поэтому лимит делится
+на THROTTLE_WORKERS.
+
+Кроме частоты, тяжёлые эндпоинты ограничены числом одновременных
+запросов (CONCURRENCY_LIMITS). Это лимит одного процесса: он защищает
+потоки воркера, а на весь сервер приходится CONCURRENCY_LIMITS[name]
+запросов на каждый воркер. Сверх лимита запрос сразу получает 503
+с Retry-After, а потоки воркера остаются свободными для остальных
+запросов.
+"""
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import (AnonRateThrottle, SimpleRateThrottle,
+                                       UserRateThrottle)
+
+from foodgram.caches import is_shared
+
+
+class CounterRateThrottle(SimpleRateThrottle):
+    """Троттлинг с атомарным счётчиком в окне фиксированной длины."""
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def limit(self):
+        """Лимит запросов в окне для счётчика этого кэша."""
+        if is_shared(settings.THROTTLE_CACHE_ALIAS):
+            return self.num_requests
+        return max(1, self.num_requests // settings.THROTTLE_WORKERS)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.window_end = (window + 1) * self.duration
+        key = f'{self.key}_{window}'
+        self.cache.add(key, 0, self.duration + 1)
+        try:
+            count = self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 1, self.duration + 1)
+            count = 1
+        return count <= self.limit()
+
+    def wait(self):
+        return max(self.window_end - self.now, 1)
+
+
+class AnonCounterThrottle(CounterRateThrottle, AnonRateThrottle):
+    """Лимит анонимных запросов на IP-адрес (scope anon)."""
+
+
+class UserCounterThrottle(CounterRateThrottle, UserRateThrottle):
+    """Лимит запросов на пользователя или IP-адрес (scope user)."""
+
+
+class ActionRateThrottle(CounterRateThrottle):
+    """
+    Лимит для отдельных действий вьюсета.
+
+    Scope берётся из атрибута вьюсета throttle_scopes
+    ({действие: scope}), лимит считается на пользователя,
+    а для анонимных запросов - на IP-адрес.
+    """
+
+    def __init__(self):
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scopes', {}).get(
+            getattr(view, 'action', None)
+        )
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class Overloaded(APIException):
+    """Ответ 503, когда заняты все слоты тяжёлого эндпоинта."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+slots = {}
+slots_lock = threading.Lock()
+
+
+@contextmanager
+def concurrency_slot(name):
+    """
+    Слот для тяжёлого запроса группы name.
+
+    Слоты свои у каждого процесса. Если все CONCURRENCY_LIMITS[name]
+    слотов процесса заняты,
+    выбрасывает Overloaded, не дожидаясь освобождения.
+    """
+    with slots_lock:
+        if name not in slots:
+            slots[name] = threading.BoundedSemaphore(
+                settings.CONCURRENCY_LIMITS[name]
+            )
+    slot = slots[name]
+    if not slot.acquire(blocking=False):
+        raise Overloaded(settings.CONCURRENCY_RETRY_AFTER)
+    try:
+        yield
+    finally:
+        slot.release()
+
+
+def concurrency_limit(name):
+    """Декоратор метода вьюсета с ограничением concurrency_slot(name)."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            with concurrency_slot(name):
+                return method(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,7 +1,9 @@
 """URL's for API."""
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import async_urlpatterns
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
 
 v1_router = DefaultRouter()
@@ -9,9 +11,13 @@ v1_router.register('ingredients', IngredientViewSet, basename='ingredients')
 v1_router.register('tags', TagViewSet, basename='tags')
 v1_router.register('recipes', RecipeViewSet, basename='recipes')
 v1_router.register('users', UserViewSet, basename='users')
+
+router_urls = v1_router.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = async_urlpatterns(router_urls)
+
 app_name = 'api'
 urlpatterns = [
-    path('', include(v1_router.urls)),
-    path('', include('djoser.urls')),
+    path('', include(router_urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
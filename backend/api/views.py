@@ -1,9 +1,15 @@
 """Вьюсеты для приложения API."""
+from contextlib import nullcontext
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError
+from django.db.models import Exists, OuterRef, Sum
+from django.db.transaction import atomic
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
@@ -11,25 +17,146 @@ from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
+from .exports import CSVRenderer, NDJSONRenderer, export_records
+from .fieldsets import FIELDS_PARAM, OMIT_PARAM, requested_fields
 from .filters import IngredientSearchFilter, RecipeFilter
 from .pagination import CustomPagination
-from .serializers import (CreateUpdateRecipeSerializer, FavoriteSerializer,
-                          IngredientSerializer, ListRecipeSerializer,
-                          ShoppingCartSerializer, SubscribeCreateSerializer,
-                          SubscribeSerializer, TagSerializer)
+from .payloads import precompressed_response
+from .read_models import deferred_rebuild, read_recipe, read_recipe_list
+from .relations import add_recipe, add_subscription, insert_connection
+from .representations import (RECIPE_COMPACT_FIELDS, RECIPE_LIST_FIELDS,
+                              SUBSCRIPTION_FIELDS, USER_FIELDS,
+                              ingredient_list, project, subscription_list)
+from .serializers import (BatchIdsSerializer, CreateUpdateRecipeSerializer,
+                          FavoriteSerializer, IngredientSerializer,
+                          ListRecipeSerializer, ShoppingCartSerializer,
+                          SubscribeCreateSerializer, TagSerializer,
+                          UserSerializer)
+from .throttling import concurrency_limit, concurrency_slot
 from recipes.models import (Favorite, Ingredient, IngredientQuantity, Recipe,
                             ShoppingCart, Tag, User)
 from users.models import Subscribe
 
 User = get_user_model()
 
+# Ответы на повторное добавление, которое отсекает уникальное ограничение БД.
+ALREADY_ADDED = {
+    Favorite: 'Рецепт уже в избранном.',
+    ShoppingCart: 'Рецепт уже в списке покупок.',
+}
+ALREADY_SUBSCRIBED = 'Нельзя подписыаться на одного автора дважды.'
+
+
+def batch_results(ids, found, existing):
+    """
+    Формирование поэлементного результата пакетного запроса.
+
+    found - id объектов, которые есть в БД,
+    existing - id объектов, которые уже были связаны с пользователем.
+    """
+    results = []
+    for pk in ids:
+        if pk not in found:
+            result = 'not_found'
+        elif pk in existing:
+            result = 'exists'
+        else:
+            result = 'created'
+        results.append({'id': pk, 'status': result})
+    return results
+
+
+class UserViewSet(DjoserUserViewSet):
+    """
+    UserViewSet for API.
+
+    Эндпоинты djoser (users/, users/{id}/, users/me/ и т.д.)
+    с подписками. Флаг is_subscribed для списка и профиля
+    вычисляется подзапросом Exists, а не запросом на каждого пользователя.
+    Список, профиль и подписки поддерживают ?fields= и ?omit=
+    (api.fieldsets).
+    """
 
-class UserViewSet(viewsets.GenericViewSet):
-    """UserViewSet for API."""
-
-    queryset = User.objects.all()
     pagination_class = CustomPagination
-    serializer_class = SubscribeSerializer
+    lookup_field = 'pk'
+    throttle_scopes = {'list': 'user_list', 'export': 'export'}
+
+    @concurrency_limit('user_list')
+    def list(self, request, *args, **kwargs):
+        """Список пользователей с ограничением одновременных запросов."""
+        return super().list(request, *args, **kwargs)
+
+    def response_fields(self):
+        """Поля пользователя в ответе на GET/HEAD или None для записи."""
+        if self.request.method not in ('GET', 'HEAD'):
+            return None
+        return requested_fields(
+            self.request, UserSerializer.Meta.fields
+        )
+
+    def get_serializer_context(self):
+        """Контекст сериализатора с полями ответа."""
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve', 'me'):
+            context['fields'] = self.response_fields()
+        return context
+
+    def get_queryset(self):
+        """
+        Метод получения пользователей с флагом подписки.
+
+        Подзапрос флага не выполняется, если is_subscribed
+        исключён из ответа.
+        """
+        queryset = super().get_queryset()
+        user = self.request.user
+        fields = self.response_fields()
+        if (
+            self.action in ('list', 'retrieve')
+            and user.is_authenticated
+            and (fields is None or 'is_subscribed' in fields)
+        ):
+            queryset = queryset.annotate(
+                is_subscribed=Exists(
+                    Subscribe.objects.filter(
+                        following=user, author=OuterRef('pk')
+                    )
+                )
+            )
+        return queryset
+
+    @action(
+        detail=False,
+        url_path='me/export',
+        permission_classes=[IsAuthenticated],
+        renderer_classes=(NDJSONRenderer, CSVRenderer),
+    )
+    def export(self, request):
+        """
+        Выгрузка рецептов, избранного и списка покупок пользователя.
+
+        Формат выбирается заголовком Accept или параметром
+        ?format=ndjson|csv. Ответ отдаётся потоком (api.exports).
+        Под ASGI Django 3.2 читает потоковый ответ в цикле событий,
+        где запросы к БД запрещены, поэтому там тело собирается
+        целиком в потоке вьюхи.
+        """
+        renderer = request.accepted_renderer
+        content = renderer.stream(export_records(
+            request.user, settings.EXPORT_CHUNK_SIZE, request
+        ))
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        if isinstance(request._request, ASGIRequest):
+            response = HttpResponse(b''.join(content), content_type)
+        else:
+            response = StreamingHttpResponse(content, content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="foodgram-{request.user.pk}.'
+            f'{renderer.format}"'
+        )
+        return response
 
     @action(
         detail=True,
@@ -37,33 +164,100 @@ class UserViewSet(viewsets.GenericViewSet):
         permission_classes=[IsAuthenticated]
     )
     def subscribe(self, request, pk):
-        """Эндпоинт подписки."""
+        """
+        Эндпоинт подписки.
+
+        Повторная подписка отсекается уникальным ограничением БД,
+        поэтому одновременные запросы не приводят к ошибке 500.
+        На PostgreSQL подписка выполняется одним запросом (relations).
+        """
         user = request.user
+        connection = insert_connection(Subscribe)
+        if connection is not None:
+            return self.subscribe_in_one_query(request, connection, pk)
         author = get_object_or_404(User, id=pk)
         if user == author:
             return Response({
                 'errors': 'Нельзя сотворить здесь!'
             }, status=status.HTTP_400_BAD_REQUEST)
-        if Subscribe.objects.filter(following=user, author=author).exists():
+        try:
+            with atomic():
+                subscribe = Subscribe.objects.create(
+                    following=user, author=author
+                )
+        except IntegrityError:
             return Response({
-                'errors': 'Нельзя подписыаться на одного автора дважды.'
+                'errors': ALREADY_SUBSCRIBED
             }, status=status.HTTP_400_BAD_REQUEST)
-        subscribe = Subscribe.objects.create(following=user, author=author)
         serializer = SubscribeCreateSerializer(
             subscribe, context={'request': request}
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def subscribe_in_one_query(self, request, connection, pk):
+        """Подписка одним запросом INSERT на PostgreSQL."""
+        if not pk.isdigit():
+            raise Http404
+        if int(pk) == request.user.pk:
+            return Response({
+                'errors': 'Нельзя сотворить здесь!'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        author = add_subscription(connection, request, pk)
+        if author is not None:
+            return Response(author, status=status.HTTP_201_CREATED)
+        get_object_or_404(User.objects.using(connection.alias), id=pk)
+        return Response({
+            'errors': ALREADY_SUBSCRIBED
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     @subscribe.mapping.delete
     def delete_subscribe(self, request, pk):
-        """Эндпоинт удаления подписки."""
+        """Эндпоинт удаления подписки одним запросом DELETE."""
+        deleted, _ = Subscribe.objects.filter(
+            following=request.user, author_id=pk
+        ).delete()
+        if not deleted:
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=False,
+        methods=('post',),
+        permission_classes=[IsAuthenticated],
+        url_path='subscribe',
+        url_name='subscribe-batch',
+    )
+    def subscribe_batch(self, request):
+        """
+        Эндпоинт пакетной подписки.
+
+        Принимает {"ids": [...]} и подписывает пользователя на всех
+        найденных авторов одним запросом на вставку.
+        """
+        serializer = BatchIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
         user = request.user
-        author = get_object_or_404(User, id=pk)
-        subscribe = get_object_or_404(
-            Subscribe, following=user, author=author
+        found = set(
+            User.objects.filter(id__in=ids).exclude(
+                id=user.id
+            ).values_list('id', flat=True)
+        )
+        existing = set(
+            Subscribe.objects.filter(
+                following=user, author_id__in=found
+            ).values_list('author_id', flat=True)
+        )
+        Subscribe.objects.bulk_create(
+            [
+                Subscribe(following=user, author_id=author_id)
+                for author_id in found - existing
+            ],
+            ignore_conflicts=True
+        )
+        return Response(
+            batch_results(ids, found, existing), status=status.HTTP_200_OK
         )
-        subscribe.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=False,
@@ -77,15 +271,15 @@ class UserViewSet(viewsets.GenericViewSet):
         Авторов, на которых существует подписка
         запрашивающего пользователя.
         """
+        fields = requested_fields(request, SUBSCRIPTION_FIELDS)
         result = self.paginate_queryset(
             User.objects.filter(
                 following__following=request.user
-            )
+            ).values(*USER_FIELDS)
         )
-        serializer = SubscribeSerializer(
-            result, many=True, context={'request': request}
+        return self.get_paginated_response(
+            subscription_list(result, request, fields)
         )
-        return self.get_paginated_response(serializer.data)
 
 
 class IngredientViewSet(viewsets.ModelViewSet):
@@ -97,6 +291,30 @@ class IngredientViewSet(viewsets.ModelViewSet):
     filterset_class = IngredientSearchFilter
     search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        """
+        Список ингредиентов без создания объектов модели.
+
+        Полный список (без поиска) отдаётся из кэша сжатых ответов.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        if request.query_params:
+            return Response(ingredient_list(queryset))
+        return precompressed_response(
+            request, 'ingredients', lambda: ingredient_list(queryset)
+        )
+
+    @atomic
+    def perform_destroy(self, instance):
+        """
+        Удаление ингредиента.
+
+        Рецепты, из которых ингредиент удаляется каскадом,
+        пересобираются по одному разу (api.read_models).
+        """
+        with deferred_rebuild():
+            instance.delete()
+
 
 class TagViewSet(viewsets.ModelViewSet):
     """Вьюсет для модели Тегов API."""
@@ -106,6 +324,13 @@ class TagViewSet(viewsets.ModelViewSet):
     serializer_class = TagSerializer
     search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        """Список тегов из кэша сжатых ответов."""
+        return precompressed_response(
+            request, 'tags',
+            lambda: self.get_serializer(self.get_queryset(), many=True).data
+        )
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Вьюсет для модели Рецептов API."""
@@ -115,6 +340,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     filterset_class = RecipeFilter
     search_fields = ('=name',)
+    throttle_scopes = {
+        'list': 'recipe_list',
+        'download_shopping_cart': 'download',
+    }
 
     def get_serializer_class(self):
         """Метод для определения метода сериализации объекта."""
@@ -122,6 +351,52 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return CreateUpdateRecipeSerializer
         return ListRecipeSerializer
 
+    def list(self, request, *args, **kwargs):
+        """
+        Список рецептов.
+
+        Страница собирается из готовых представлений рецептов
+        (api.read_models) с флагами пользователя одним запросом,
+        без ListRecipeSerializer. По умолчанию отдаются поля карточки
+        рецепта (RECIPE_COMPACT_FIELDS), без текста и ингредиентов;
+        остальные поля запрашиваются параметром ?fields=.
+        Дальние страницы (OFFSET больше RECIPE_DEEP_PAGE страниц)
+        ограничены числом одновременных запросов.
+        """
+        fields = requested_fields(
+            request, RECIPE_LIST_FIELDS, RECIPE_COMPACT_FIELDS
+        )
+        page = request.query_params.get(self.paginator.page_query_param, '')
+        deep = page.isdigit() and int(page) > settings.RECIPE_DEEP_PAGE
+        with concurrency_slot('recipe_pages') if deep else nullcontext():
+            page = self.paginate_queryset(
+                self.filter_queryset(
+                    self.get_queryset()
+                ).values_list('id', flat=True)
+            )
+            return self.get_paginated_response(
+                read_recipe_list(page, request, fields)
+            )
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Один рецепт.
+
+        Ответ строится из готового представления рецепта
+        (api.read_models) одним запросом. Запросы с параметрами,
+        кроме ?fields= и ?omit=, идут обычным путём.
+        """
+        fields = requested_fields(request, RECIPE_LIST_FIELDS)
+        if set(request.query_params) - {FIELDS_PARAM, OMIT_PARAM}:
+            response = super().retrieve(request, *args, **kwargs)
+            response.data = project(response.data, fields)
+            return response
+        pk = kwargs[self.lookup_field]
+        recipe = read_recipe(pk, request, fields) if pk.isdigit() else None
+        if recipe is None:
+            raise Http404
+        return Response(recipe)
+
     def perform_create(self, serializer):
         """Переопределение метода создания объекта."""
         return serializer.save(author=self.request.user)
@@ -131,21 +406,33 @@ class RecipeViewSet(viewsets.ModelViewSet):
         Метод для добавления объекта.
 
         Универсальный метод для добавления
-        объектов связанных с рецептом.
+        объектов связанных с рецептом. Повторное добавление
+        отсекается уникальным ограничением БД без отдельной проверки.
+        На PostgreSQL добавление выполняется одним запросом (relations).
         """
-        user = request.user
+        model = AnySerializer.Meta.model
+        connection = insert_connection(model)
+        if connection is not None:
+            if not pk.isdigit():
+                raise Http404
+            recipe = add_recipe(connection, model, request, pk)
+            if recipe is not None:
+                return Response(recipe, status=status.HTTP_201_CREATED)
+            get_object_or_404(Recipe.objects.using(connection.alias), id=pk)
+            return Response({
+                'errors': ALREADY_ADDED[model]
+            }, status=status.HTTP_400_BAD_REQUEST)
         recipe = get_object_or_404(Recipe, id=pk)
-
-        data = {
-            'user': user.id,
-            'recipe': recipe.id,
-        }
-        serializer = AnySerializer(
-            data=data,
-            context={'request': request}
-        )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        try:
+            with atomic():
+                instance = model.objects.create(
+                    user=request.user, recipe=recipe
+                )
+        except IntegrityError:
+            return Response({
+                'errors': ALREADY_ADDED[model]
+            }, status=status.HTTP_400_BAD_REQUEST)
+        serializer = AnySerializer(instance, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def recipe_delete_method(self, request, AnyModel, pk):
@@ -153,15 +440,44 @@ class RecipeViewSet(viewsets.ModelViewSet):
         Универсальный метод для удаления объекта.
 
         Объекта связанного с моделью рецепта.
-        Избранное, список покупок.
+        Избранное, список покупок. Удаление выполняется одним запросом.
         """
+        deleted, _ = AnyModel.objects.filter(
+            user=request.user, recipe_id=pk
+        ).delete()
+        if not deleted:
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def recipe_batch_post_method(self, request, AnyModel):
+        """
+        Универсальный метод для пакетного добавления объектов.
+
+        Проверяет все id рецептов одним запросом и добавляет
+        недостающие связи одним bulk_create.
+        """
+        serializer = BatchIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
         user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-        favorites = get_object_or_404(
-            AnyModel, user=user, recipe=recipe
+        found = set(
+            Recipe.objects.filter(id__in=ids).values_list('id', flat=True)
+        )
+        existing = set(
+            AnyModel.objects.filter(
+                user=user, recipe_id__in=found
+            ).values_list('recipe_id', flat=True)
+        )
+        AnyModel.objects.bulk_create(
+            [
+                AnyModel(user=user, recipe_id=recipe_id)
+                for recipe_id in found - existing
+            ],
+            ignore_conflicts=True
+        )
+        return Response(
+            batch_results(ids, found, existing), status=status.HTTP_200_OK
         )
-        favorites.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=True, methods=['post', ],
@@ -189,8 +505,27 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Метод для удаления рецепта из списка покупок."""
         return self.recipe_delete_method(request, ShoppingCart, pk)
 
+    @action(
+        detail=False, methods=['post', ],
+        permission_classes=(IsAuthenticated, ),
+        url_path='favorite', url_name='favorite-batch'
+    )
+    def favorite_batch(self, request):
+        """Метод для пакетного добавления рецептов в "избранное"."""
+        return self.recipe_batch_post_method(request, Favorite)
+
+    @action(
+        detail=False, methods=['post', ],
+        permission_classes=(IsAuthenticated, ),
+        url_path='shopping_cart', url_name='shopping-cart-batch'
+    )
+    def shopping_cart_batch(self, request):
+        """Метод для пакетного добавления рецептов в список покупок."""
+        return self.recipe_batch_post_method(request, ShoppingCart)
+
     @action(detail=False, methods=['get'],
             permission_classes=[IsAuthenticated])
+    @concurrency_limit('download')
     def download_shopping_cart(self, request):
         """
         Эндпоинт для скачивания списка ингредиентов.
@@ -202,7 +537,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         их количество суммируется.
         """
         shopping_cart = IngredientQuantity.objects.filter(
-            current_recipe__cart_recipe__user=request.user
+            current_recipe__in=ShoppingCart.objects.filter(
+                user=request.user
+            ).values('recipe_id')
         ).values_list(
             'ingredient__name', 'ingredient__measurement_unit'
         ).order_by(
@@ -0,0 +1,91 @@
+"""
+Прогрев воркера после запуска.
+
+Первые запросы нового воркера (после деплоя или перезапуска по
+max_requests) открывают соединение с БД, заполняют кэши процесса
+и впервые проходят по коду DRF, поэтому заметно медленнее остальных.
+warm_up() заранее выполняет самые частые запросы: списки тегов
+и ингредиентов (заполняет кэш сжатых ответов api.payloads) и первые
+WARMUP_RECIPE_PAGES страниц рецептов в порядке по умолчанию (строки
+RecipeReadModel попадают в кэш страниц БД). Запросы вызывают
+вьюсеты напрямую, минуя middleware и троттлинг, и не попадают
+в метрики HTTP-запросов.
+
+start_warm_up() запускает прогрев в фоновом потоке и сразу
+возвращается: воркер принимает запросы, не дожидаясь прогрева.
+Вызывается из хука post_worker_init gunicorn и из foodgram.asgi.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import reverse
+
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+from foodgram.metrics import WARMUP_DURATION
+
+logger = logging.getLogger('foodgram.warmup')
+
+
+def warm_up_host():
+    """Имя хоста запросов прогрева из ALLOWED_HOSTS."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def warm_up_steps():
+    """Шаги прогрева: (название, вьюсет, путь, параметры запроса)."""
+    steps = [
+        ('tags', TagViewSet, reverse('api:tags-list'), {}),
+        ('ingredients', IngredientViewSet, reverse('api:ingredients-list'),
+         {}),
+    ]
+    recipes = reverse('api:recipes-list')
+    for page in range(1, settings.WARMUP_RECIPE_PAGES + 1):
+        steps.append(
+            (f'recipes-page-{page}', RecipeViewSet, recipes, {'page': page})
+        )
+    return steps
+
+
+def warm_up():
+    """Выполнение шагов прогрева с записью времени каждого шага."""
+    factory = RequestFactory(SERVER_NAME=warm_up_host())
+    started = time.perf_counter()
+    timings = []
+    try:
+        for step, viewset, path, params in warm_up_steps():
+            step_started = time.perf_counter()
+            view = viewset.as_view({'get': 'list'}, throttle_classes=())
+            response = view(factory.get(
+                path, params, HTTP_ACCEPT='application/json'
+            ))
+            if hasattr(response, 'render'):
+                response.render()
+            duration = time.perf_counter() - step_started
+            WARMUP_DURATION.labels(step).observe(duration)
+            timings.append(f'{step} {duration * 1000:.0f} мс')
+    except Exception:
+        logger.exception('Ошибка прогрева воркера')
+    finally:
+        connections.close_all()
+    duration = time.perf_counter() - started
+    WARMUP_DURATION.labels('total').observe(duration)
+    logger.info(
+        'Прогрев воркера за %.0f мс: %s', duration * 1000, ', '.join(timings)
+    )
+    return duration
+
+
+def start_warm_up():
+    """Прогрев в фоновом потоке, если WARMUP_ENABLED."""
+    if not settings.WARMUP_ENABLED:
+        return None
+    thread = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+    thread.start()
+    return thread
@@ -1 +1,9 @@
 """Файл инициализации проекта foodgram."""
+import os
+
+# prometheus_client в многопроцессном режиме пишет значения метрик
+# в файлы каталога PROMETHEUS_MULTIPROC_DIR, но сам его не создаёт.
+# gunicorn создаёт каталог в on_starting, а manage.py run_worker,
+# uvicorn и остальные команды запускаются без этого хука.
+if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
@@ -0,0 +1,23 @@
+"""
+ASGI config for foodgram project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Read-only API endpoints are served by async views (see api.async_views).
+Each worker process warms up caches in the background (see api.warmup).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
+
+application = get_asgi_application()
+
+from api.warmup import start_warm_up  # noqa: E402
+
+start_warm_up()
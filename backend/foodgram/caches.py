@@ -0,0 +1,16 @@
+"""
+Проверка, что кэш общий для всех процессов.
+
+LocMemCache хранит значения в памяти процесса: у каждого воркера
+gunicorn свой кэш, и значение, записанное или удалённое в одном
+воркере, другие не видят. Кэш токенов, закрепление клиента
+за основной БД и счётчики лимитов запросов правильно работают
+только с общим кэшем (memcached в settings_production).
+"""
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared(alias='default'):
+    """Виден ли кэш alias всем процессам."""
+    return not isinstance(caches[alias], LocMemCache)
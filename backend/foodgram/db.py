@@ -0,0 +1,79 @@
+"""
+Постоянные соединения с БД.
+
+С CONN_MAX_AGE соединение не закрывается после запроса, и следующий
+запрос того же потока обходится без установки TCP-соединения
+и аутентификации. Django 3.2 не проверяет такое соединение перед
+повторным использованием (CONN_HEALTH_CHECKS появился в Django 4.1),
+поэтому check_connections() в начале запроса проверяет соединения,
+простаивавшие дольше CONN_HEALTH_CHECK_IDLE секунд, и закрывает
+неработающие: запрос откроет новое вместо ошибки на разорванном.
+
+Счётчики открытых, повторно использованных и проверенных соединений
+отдаются в /metrics.
+"""
+import time
+
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from prometheus_client import Counter
+
+CONNECTIONS_OPENED = Counter(
+    'foodgram_db_connections_opened_total',
+    'Количество новых соединений с БД.',
+    ('alias',),
+)
+CONNECTIONS_REUSED = Counter(
+    'foodgram_db_connections_reused_total',
+    'Запросы, начатые с уже открытым соединением с БД.',
+    ('alias',),
+)
+HEALTH_CHECKS = Counter(
+    'foodgram_db_health_checks_total',
+    'Проверки простаивавших соединений с БД.',
+    ('alias', 'result'),
+)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """Учёт нового соединения."""
+    connection.released_at = time.monotonic()
+    CONNECTIONS_OPENED.labels(connection.alias).inc()
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """
+    Проверка открытых соединений текущего потока перед запросом.
+
+    Соединение, которое использовалось недавно, считается рабочим,
+    чтобы не тратить на проверку лишний запрос к БД.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        alias = connection.alias
+        CONNECTIONS_REUSED.labels(alias).inc()
+        idle = connection.settings_dict.get('CONN_HEALTH_CHECK_IDLE')
+        if idle is None or connection.in_atomic_block:
+            continue
+        if now - getattr(connection, 'released_at', now) < idle:
+            continue
+        if connection.is_usable():
+            HEALTH_CHECKS.labels(alias, 'ok').inc()
+        else:
+            HEALTH_CHECKS.labels(alias, 'failed').inc()
+            connection.close()
+
+
+@receiver(request_finished)
+def release_connections(**kwargs):
+    """Отметка времени, с которого соединения простаивают."""
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.released_at = now
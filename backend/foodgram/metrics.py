@@ -0,0 +1,121 @@
+"""
+Метрики в формате Prometheus.
+
+MetricsMiddleware считает для каждого маршрута (api:recipes-list,
+api:recipes-favorite, api:recipes-download-shopping-cart,
+api:users-subscriptions и т.д.) число запросов, время ответа, размер
+ответа, число и время SQL-запросов. Эндпоинт /metrics отдаёт их
+в текстовом формате Prometheus.
+
+При нескольких воркерах gunicorn переменная окружения
+PROMETHEUS_MULTIPROC_DIR должна указывать на общий каталог: каждый
+процесс пишет свои значения в файлы, а /metrics собирает их вместе.
+"""
+import os
+import time
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+from .middleware import InstrumentationMiddleware
+
+REQUESTS = Counter(
+    'foodgram_http_requests_total',
+    'Количество HTTP-запросов.',
+    ('method', 'route', 'status'),
+)
+LATENCY = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время обработки HTTP-запроса.',
+    ('method', 'route'),
+    buckets=(
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+    ),
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_http_response_size_bytes',
+    'Размер тела HTTP-ответа.',
+    ('method', 'route'),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+DB_QUERIES = Counter(
+    'foodgram_db_queries_total',
+    'Количество SQL-запросов.',
+    ('route',),
+)
+DB_TIME = Counter(
+    'foodgram_db_query_duration_seconds_total',
+    'Суммарное время SQL-запросов.',
+    ('route',),
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кэшу.',
+    ('cache', 'result'),
+)
+WARMUP_DURATION = Histogram(
+    'foodgram_warmup_duration_seconds',
+    'Время прогрева воркера после запуска (api.warmup).',
+    ('step',),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+def record_cache(name, hit):
+    """Учёт попадания или промаха кэша."""
+    CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc()
+
+
+class QueryCounter:
+    """Подсчёт SQL-запросов через connection.execute_wrapper."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.queries += 1
+
+
+class MetricsMiddleware(InstrumentationMiddleware):
+    """Middleware сбора метрик по маршрутам."""
+
+    def start(self, request):
+        return QueryCounter()
+
+    def finish(self, request, response, counter):
+        elapsed = time.perf_counter() - counter.started
+        route = getattr(request.resolver_match, 'view_name', None)
+        if route == 'metrics':
+            return response
+        route = route or 'unmatched'
+        REQUESTS.labels(request.method, route, response.status_code).inc()
+        LATENCY.labels(request.method, route).observe(elapsed)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(request.method, route).observe(
+                len(response.content)
+            )
+        if counter.queries:
+            DB_QUERIES.labels(route).inc(counter.queries)
+            DB_TIME.labels(route).inc(counter.time)
+        return response
+
+
+def metrics_view(request):
+    """Эндпоинт /metrics."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
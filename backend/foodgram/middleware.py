@@ -0,0 +1,274 @@
+"""
+Профилирование запросов.
+
+ProfilingMiddleware измеряет для выбранных (по PROFILING_SAMPLE_RATE)
+запросов общее время, время и количество SQL-запросов, время
+сериализации и рендеринга ответа. Результат отдаётся в заголовке
+Server-Timing и пишется одной JSON-строкой в логгер foodgram.profiling.
+С PROFILING_ATTRIBUTE_QUERIES = True повторяющиеся SQL-запросы
+привязываются к методу сериализатора или вьюсета, который их выполнил.
+"""
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework import serializers
+
+logger = logging.getLogger('foodgram.profiling')
+
+current_profile = ContextVar('current_profile', default=None)
+
+
+def find_query_origin():
+    """
+    Поиск метода, выполнившего SQL-запрос.
+
+    Идёт по стеку от текущего кадра вверх и возвращает первый метод
+    сериализатора или вьюсета, например ListRecipeSerializer.get_is_favorited.
+    """
+    # Импорт здесь: rest_framework.views при загрузке читает настройки DRF,
+    # а они ссылаются на api.authentication, который импортирует этот модуль.
+    from rest_framework.views import APIView
+
+    frame = sys._getframe(2)
+    while frame is not None:
+        owner = frame.f_locals.get('self')
+        if isinstance(owner, (serializers.BaseSerializer, APIView)):
+            return f'{type(owner).__name__}.{frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+class RequestProfile:
+    """Измерения одного запроса."""
+
+    def __init__(self, attribute_queries=False):
+        self.started = time.perf_counter()
+        self.total_time = 0.0
+        self.db_time = 0.0
+        self.queries = 0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.render_time = 0.0
+        self.attribute_queries = attribute_queries
+        self.query_origins = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper."""
+        if self.attribute_queries:
+            self.query_origins[(find_query_origin(), sql)] += 1
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def finish(self):
+        """Фиксация общего времени запроса."""
+        self.total_time = time.perf_counter() - self.started
+
+    def duplicates(self):
+        """Повторяющиеся запросы с указанием их источника."""
+        return [
+            {'origin': origin, 'sql': sql, 'count': count}
+            for (origin, sql), count in self.query_origins.most_common()
+            if count > 1
+        ]
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing."""
+        return ', '.join((
+            f'total;dur={self.total_time * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'serializer;dur={self.serializer_time * 1000:.1f}',
+            f'render;dur={self.render_time * 1000:.1f}',
+        ))
+
+    def as_dict(self):
+        """Измерения в виде словаря для лога."""
+        data = {
+            'total_ms': round(self.total_time * 1000, 1),
+            'db_ms': round(self.db_time * 1000, 1),
+            'queries': self.queries,
+            'serializer_ms': round(self.serializer_time * 1000, 1),
+            'render_ms': round(self.render_time * 1000, 1),
+        }
+        if self.attribute_queries:
+            data['duplicates'] = self.duplicates()
+        return data
+
+
+def timed_data(data_property):
+    """
+    Обёртка свойства Serializer.data для замера времени сериализации.
+
+    Вложенные сериализаторы учитываются только один раз,
+    во внешнем вызове.
+    """
+    getter = data_property.fget
+
+    def data(self):
+        profile = current_profile.get()
+        if profile is None:
+            return getter(self)
+        profile.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return getter(self)
+        finally:
+            profile.serializer_depth -= 1
+            if not profile.serializer_depth:
+                profile.serializer_time += time.perf_counter() - started
+
+    data.timed = True
+    return property(data)
+
+
+def install_serializer_timing():
+    """Подключение замера времени к сериализаторам DRF."""
+    for serializer_class in (
+        serializers.Serializer, serializers.ListSerializer
+    ):
+        if not getattr(serializer_class.data.fget, 'timed', False):
+            serializer_class.data = timed_data(serializer_class.data)
+
+
+current_wrappers = ContextVar('current_wrappers', default=())
+
+
+def dispatch_query(execute, sql, params, many, context):
+    """
+    Обёртка соединения, вызывающая обёртки текущего запроса.
+
+    Обёртки берутся из контекстной переменной, а не из потока:
+    asgiref копирует контекст в потоки sync_to_async, поэтому под ASGI
+    их видят и синхронные вьюхи, и асинхронные вьюхи чтения.
+    """
+    wrappers = current_wrappers.get()
+    for wrapper in reversed(wrappers):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_dispatch(sender, connection, **kwargs):
+    """Подключение dispatch_query к соединению один раз."""
+    if dispatch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(dispatch_query)
+
+
+class InstrumentationMiddleware:
+    """
+    Базовый middleware с обёрткой SQL-запросов.
+
+    Подкласс возвращает из start() обёртку для connection.execute_wrapper
+    (или None, чтобы не обрабатывать запрос), освобождает ресурсы в stop()
+    и дополняет ответ в finish(). Обёртка на время запроса добавляется
+    в current_wrappers и вызывается из dispatch_query в любом потоке,
+    где выполняются запросы к БД.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        # Соединения, открытые до загрузки middleware.
+        for connection in connections.all():
+            install_dispatch(None, connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        wrapper = self.start(request)
+        if wrapper is None:
+            return self.get_response(request)
+        token = current_wrappers.set((*current_wrappers.get(), wrapper))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_wrappers.reset(token)
+            self.stop(request, wrapper)
+        return self.finish(request, response, wrapper)
+
+    async def __acall__(self, request):
+        wrapper = self.start(request)
+        if wrapper is None:
+            return await self.get_response(request)
+        token = current_wrappers.set((*current_wrappers.get(), wrapper))
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_wrappers.reset(token)
+            self.stop(request, wrapper)
+        return self.finish(request, response, wrapper)
+
+    def start(self, request):
+        return None
+
+    def stop(self, request, wrapper):
+        pass
+
+    def finish(self, request, response, wrapper):
+        return response
+
+
+class ProfilingMiddleware(InstrumentationMiddleware):
+    """Middleware профилирования запросов."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.attribute_queries = settings.PROFILING_ATTRIBUTE_QUERIES
+        if self.sample_rate:
+            install_serializer_timing()
+
+    def start(self, request):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        profile = RequestProfile(self.attribute_queries)
+        profile.context_token = current_profile.set(profile)
+        request.profile = profile
+        return profile
+
+    def stop(self, request, profile):
+        current_profile.reset(profile.context_token)
+
+    def finish(self, request, response, profile):
+        profile.finish()
+        response['Server-Timing'] = profile.server_timing()
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            **profile.as_dict(),
+        }, ensure_ascii=False))
+        return response
+
+    def process_template_response(self, request, response):
+        """Замер времени рендеринга ответов DRF."""
+        profile = getattr(request, 'profile', None)
+        if profile is None:
+            return response
+        started = time.perf_counter()
+
+        def rendered(response):
+            profile.render_time += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,127 @@
+"""
+Распределение запросов между основной БД и репликами.
+
+ReplicaRoutingMiddleware выбирает БД для чтения на время запроса:
+GET/HEAD/OPTIONS читают с одной из реплик (DATABASE_REPLICAS),
+остальные запросы и всё, что выполняется вне запросов (команды
+manage.py, воркеры), работают с основной БД. Запись всегда идёт
+в основную БД.
+
+После успешной записи клиент на REPLICA_PIN_SECONDS секунд
+закрепляется за основной БД, чтобы сразу увидеть свои изменения,
+несмотря на отставание реплик: браузер по cookie, клиент API
+по ключу в кэше REPLICA_PIN_CACHE_ALIAS, связанному с заголовком
+Authorization. Следующий запрос клиента может попасть в другой
+воркер, поэтому ключ хранится только в общем кэше; с кэшем в памяти
+процесса запросы с Authorization всегда читают из основной БД.
+"""
+import asyncio
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+
+from .caches import is_shared
+
+PRIMARY = 'default'
+PIN_COOKIE = 'primary_pin'
+PIN_CACHE_KEY = 'primary-pin:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+read_database = ContextVar('read_database', default=PRIMARY)
+
+
+class PrimaryReplicaRouter:
+    """Роутер БД: чтение из выбранной для запроса БД, запись в основную."""
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+def pin_key(request):
+    """Ключ закрепления в кэше для клиента API или None."""
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return PIN_CACHE_KEY.format(
+        hashlib.sha1(authorization.encode()).hexdigest()
+    )
+
+
+class ReplicaRoutingMiddleware:
+    """Выбор БД для чтения и закрепление клиента после записи."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.replicas = settings.DATABASE_REPLICAS
+        self.pin_seconds = settings.REPLICA_PIN_SECONDS
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = read_database.set(self.choose_database(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_database.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = read_database.set(self.choose_database(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_database.reset(token)
+        return self.pin(request, response)
+
+    @staticmethod
+    def pin_cache():
+        """Кэш закреплений клиентов API."""
+        return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+    @staticmethod
+    def pin_shared():
+        """Виден ли кэш закреплений всем воркерам."""
+        return is_shared(settings.REPLICA_PIN_CACHE_ALIAS)
+
+    def choose_database(self, request):
+        if request.method not in SAFE_METHODS:
+            return PRIMARY
+        if PIN_COOKIE in request.COOKIES:
+            return PRIMARY
+        key = pin_key(request)
+        if key and (not self.pin_shared() or self.pin_cache().get(key)):
+            return PRIMARY
+        return random.choice(self.replicas)
+
+    def pin(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return response
+        response.set_cookie(
+            PIN_COOKIE, '1', max_age=self.pin_seconds,
+            httponly=True, samesite='Lax'
+        )
+        key = pin_key(request)
+        if key and self.pin_shared():
+            self.pin_cache().set(key, True, self.pin_seconds)
+        return response
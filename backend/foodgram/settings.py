@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     'django_filters',
     'sorl.thumbnail',
     'api',
+    'jobs',
     'users',
     'recipes',
     'rest_framework.authtoken',
@@ -62,6 +63,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.ProfilingMiddleware',
+    'foodgram.metrics.MetricsMiddleware',
+    'foodgram.slow_queries.SlowQueryMiddleware',
+    'foodgram.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,6 +97,14 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+# Асинхронные вьюхи для эндпоинтов чтения (api.async_views).
+# Включаются в foodgram/asgi.py, под WSGI они только добавили бы накладные
+# расходы на цикл событий в каждом запросе.
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='False') == 'True'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -104,8 +117,47 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        # Постоянные соединения (foodgram.db): по одному на поток воркера,
+        # max_connections PostgreSQL должен покрывать workers * threads.
+        # Асинхронные вьюхи чтения выполняются в пуле потоков asgiref,
+        # число потоков которого не ограничено настройками воркера,
+        # поэтому с ними соединения закрываются после запроса.
+        'CONN_MAX_AGE': 0 if ASYNC_READ_VIEWS else int(
+            os.getenv('DB_CONN_MAX_AGE', default=600)
+        ),
+        # Проверка соединения, простаивавшего дольше стольких секунд.
+        'CONN_HEALTH_CHECK_IDLE': float(
+            os.getenv('DB_HEALTH_CHECK_IDLE', default=30)
+        ),
+        # PgBouncer в режиме transaction не поддерживает
+        # серверные курсоры (QuerySet.iterator()).
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_POOLER') == 'transaction'
+        ),
     }
 }
+
+# Реплики для чтения (foodgram.routers): хосты через запятую,
+# остальные параметры подключения как у основной БД.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['foodgram.routers.PrimaryReplicaRouter']
+# Сколько секунд после записи клиент читает из основной БД.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=10))
+# Кэш закреплений клиентов API. С кэшем в памяти процесса (LocMemCache)
+# запросы с заголовком Authorization всегда читают из основной БД.
+REPLICA_PIN_CACHE_ALIAS = os.getenv(
+    'REPLICA_PIN_CACHE_ALIAS', default='default'
+)
+
 # Для локальных тестов
 # DATABASES = {
 #     'default': {
@@ -164,9 +216,12 @@ AUTH_USER_MODEL = 'users.User'
 
 # Настройки DRF (JWT, IsAuthenticated)
 
+# THROTTLE_ENABLED=False отключает лимиты запросов (нагрузочные тесты).
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', default='True') == 'True'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': (
         ('rest_framework.permissions.AllowAny', )
@@ -174,8 +229,151 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 6,
+    # Атомарные счётчики в кэше THROTTLE_CACHE_ALIAS (api.throttling).
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.AnonCounterThrottle',
+        'api.throttling.UserCounterThrottle',
+        'api.throttling.ActionRateThrottle',
+    ) if THROTTLE_ENABLED else (),
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.getenv('THROTTLE_ANON_RATE', default='600/min'),
+        'user': os.getenv('THROTTLE_USER_RATE', default='1200/min'),
+        'recipe_list': '300/min',
+        'user_list': '60/min',
+        'download': '10/min',
+        'export': '10/hour',
+    },
+    # Число прокси перед приложением (nginx) для определения IP клиента.
+    'NUM_PROXIES': 1,
+}
+
+# Счётчики лимитов запросов общие для воркеров только в общем кэше.
+# С LocMemCache каждый воркер считает сам, и лимит делится
+# на THROTTLE_WORKERS - число воркеров сервера.
+THROTTLE_CACHE_ALIAS = os.getenv('THROTTLE_CACHE_ALIAS', default='default')
+THROTTLE_WORKERS = int(os.getenv('THROTTLE_WORKERS', default=1))
+
+# Одновременные тяжёлые запросы на процесс (api.throttling): остальные
+# потоки воркера продолжают обслуживать лёгкие запросы. На весь сервер
+# приходится лимит, умноженный на число воркеров.
+CONCURRENCY_LIMITS = {
+    'download': 2,
+    'user_list': 2,
+    'recipe_pages': 2,
+}
+CONCURRENCY_RETRY_AFTER = 1
+# Страницы списка рецептов дальше этой считаются тяжёлыми.
+RECIPE_DEEP_PAGE = 50
+# Фоновые задачи (приложение jobs, manage.py run_worker).
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', default=5))
+# Задержка перед повтором: JOB_BACKOFF_BASE * 2 ** (попытка - 1) секунд,
+# но не больше JOB_BACKOFF_MAX.
+JOB_BACKOFF_BASE = int(os.getenv('JOB_BACKOFF_BASE', default=10))
+JOB_BACKOFF_MAX = int(os.getenv('JOB_BACKOFF_MAX', default=3600))
+# Через сколько секунд задача зависшего воркера возвращается в очередь.
+JOB_LOCK_TIMEOUT = int(os.getenv('JOB_LOCK_TIMEOUT', default=600))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', default=1))
+# Число рецептов в одной задаче пересборки представлений.
+READ_MODEL_JOB_SIZE = 500
+# Сколько рецептов изменённого тега, ингредиента или автора пересобирается
+# в той же транзакции; представления остальных пересобирают фоновые задачи.
+READ_MODEL_SYNC_LIMIT = int(
+    os.getenv('READ_MODEL_SYNC_LIMIT', default=1000)
+)
+# Прогрев воркера после запуска (api.warmup): списки тегов, ингредиентов
+# и первые WARMUP_RECIPE_PAGES страниц рецептов.
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', default='True') == 'True'
+WARMUP_RECIPE_PAGES = int(os.getenv('WARMUP_RECIPE_PAGES', default=5))
+# Число рецептов в одной пачке потоковой выгрузки (api.exports).
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', default=500))
+
+# Настройки кэша
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
+# Кэш сжатых списков тегов и ингредиентов (api.payloads).
+PAYLOAD_CACHE_TIMEOUT = int(os.getenv('PAYLOAD_CACHE_TIMEOUT', default=600))
+# Сколько секунд клиенты и прокси могут не перепроверять списки.
+PAYLOAD_CACHE_MAX_AGE = int(os.getenv('PAYLOAD_CACHE_MAX_AGE', default=3600))
+
+# Кэш токенов аутентификации (api.authentication.CachedTokenAuthentication).
+# Работает только с общим кэшем (memcached в settings_production): с кэшем
+# в памяти процесса выход из аккаунта сбросил бы его только в одном воркере,
+# поэтому с LocMemCache токены не кэшируются.
+
+TOKEN_CACHE_ALIAS = os.getenv('TOKEN_CACHE_ALIAS', default='default')
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', default=300))
+
+# Профилирование запросов (foodgram.middleware.ProfilingMiddleware).
+# PROFILING_SAMPLE_RATE - доля профилируемых запросов от 0 до 1,
+# PROFILING_ATTRIBUTE_QUERIES - поиск источника повторяющихся SQL-запросов.
+
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', default=0))
+PROFILING_ATTRIBUTE_QUERIES = (
+    os.getenv('PROFILING_ATTRIBUTE_QUERIES', default='False') == 'True'
+)
+
+# Журнал медленных запросов (foodgram.slow_queries.SlowQueryMiddleware).
+# SLOW_QUERY_THRESHOLD - порог в миллисекундах, 0 отключает журнал,
+# SLOW_QUERY_EXPLAIN_LIMIT - для скольких самых долгих по суммарному
+# времени форм запросов процесс снимает план.
+
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', default=200))
+SLOW_QUERY_EXPLAIN_LIMIT = int(
+    os.getenv('SLOW_QUERY_EXPLAIN_LIMIT', default=50)
+)
+SLOW_QUERY_LOG = os.getenv(
+    'SLOW_QUERY_LOG', default=os.path.join(BASE_DIR, 'slow_queries.log')
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+        'slow_queries': {
+            'class': 'logging.FileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'encoding': 'utf-8',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'foodgram': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'jobs': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'foodgram.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
 }
 
 # Настройки электронной почты
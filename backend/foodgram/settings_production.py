@@ -0,0 +1,37 @@
+"""
+Django settings for foodgram project in production.
+
+Подключаются через DJANGO_SETTINGS_MODULE=foodgram.settings_production
+(см. Dockerfile): отключён DEBUG (Django не хранит в памяти каждый
+SQL-запрос и не раздаёт media - это делает nginx), браузерный
+интерфейс DRF не рендерится. Кэш общий для всех воркеров (memcached):
+на нём держатся кэш токенов, закрепление клиентов за основной БД
+и лимиты запросов.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK, SECRET_KEY
+
+DEBUG = False
+
+SECRET_KEY = os.getenv('SECRET_KEY', default=SECRET_KEY)
+
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', default='*').split(',')
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.memcached.PyMemcacheCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='memcached:11211'),
+    }
+}
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+    ),
+}
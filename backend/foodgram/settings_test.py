@@ -0,0 +1,20 @@
+"""
+Настройки для тестов (pytest, см. pytest.ini).
+
+Без переменных окружения тесты идут на SQLite; DB_ENGINE и остальные
+параметры подключения позволяют запустить их на PostgreSQL.
+Реплика replica1 - второе соединение с тем же сервером, а в тестах
+зеркало основной БД (TEST MIRROR): видит те же данные, но запросы
+к ней идут через отдельное соединение.
+"""
+import os
+
+os.environ.setdefault('DB_ENGINE', 'django.db.backends.sqlite3')
+os.environ.setdefault('DB_NAME', 'foodgram.sqlite3')
+os.environ.setdefault(
+    'DB_REPLICA_HOSTS', os.getenv('DB_HOST') or 'localhost'
+)
+
+from .settings import *  # noqa: E402,F401,F403
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
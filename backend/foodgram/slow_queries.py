@@ -0,0 +1,178 @@
+"""
+Журнал медленных SQL-запросов.
+
+SlowQueryMiddleware подключает к соединениям с БД обёртку
+connection.execute_wrapper. Запросы дольше SLOW_QUERY_THRESHOLD
+миллисекунд пишутся JSON-строкой в логгер foodgram.slow_queries
+вместе с маршрутом и методом сериализатора/вьюсета, который их выполнил.
+Время медленных запросов суммируется по форме запроса (SQL без
+конкретных значений); когда форма входит в SLOW_QUERY_EXPLAIN_LIMIT
+самых долгих по суммарному времени, фоновый поток один раз снимает
+её план EXPLAIN без выполнения запроса.
+Сводку строит команда manage.py slow_queries.
+"""
+import hashlib
+import json
+import logging
+import queue
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from .middleware import InstrumentationMiddleware, find_query_origin
+
+logger = logging.getLogger('foodgram.slow_queries')
+
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+
+
+def normalize(sql):
+    """Приведение запроса к форме: IN (%s, %s, ...) -> IN (%s, ...)."""
+    return IN_LIST.sub('(%s, ...)', sql)
+
+
+def fingerprint(sql):
+    """Короткий идентификатор формы запроса."""
+    return hashlib.sha1(sql.encode()).hexdigest()[:12]
+
+
+def explain_prefix(connection):
+    """Префикс EXPLAIN без выполнения запроса для текущей БД."""
+    if connection.vendor == 'postgresql':
+        return connection.ops.explain_query_prefix(analyze=False)
+    return connection.ops.explain_query_prefix()
+
+
+class ExplainWorker:
+    """
+    Фоновый поток для снятия планов запросов.
+
+    Суммарное время хранится не более чем для limit * TRACKED_FACTOR
+    форм: новая форма вытесняет форму с наименьшим временем и наследует
+    его (алгоритм Space-Saving), поэтому частые формы набирают время,
+    даже когда таблица заполнена.
+
+    Очередь ограничена: при перегрузке задачи отбрасываются,
+    а не замедляют обработку запросов.
+    """
+
+    TRACKED_FACTOR = 10
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.totals = {}
+        self.explained = set()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=100)
+        self.thread = None
+
+    def track(self, key, duration):
+        """Учёт времени формы; True, если пора снять её план."""
+        if key not in self.totals and (
+            len(self.totals) >= self.limit * self.TRACKED_FACTOR
+        ):
+            evicted = min(self.totals, key=self.totals.get)
+            self.explained.discard(evicted)
+            duration += self.totals.pop(evicted)
+        total = self.totals.get(key, 0) + duration
+        self.totals[key] = total
+        if key in self.explained:
+            return False
+        slower = sum(1 for other in self.totals.values() if other > total)
+        return slower < self.limit
+
+    def submit(self, alias, key, sql, params, duration):
+        """Постановка формы запроса в очередь, если её план нужно снять."""
+        with self.lock:
+            if not self.limit or not self.track(key, duration):
+                return
+            self.explained.add(key)
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name='explain-worker', daemon=True
+                )
+                self.thread.start()
+            total = self.totals[key]
+        try:
+            self.queue.put_nowait((alias, key, sql, params, total))
+        except queue.Full:
+            with self.lock:
+                self.explained.discard(key)
+
+    def run(self):
+        while True:
+            alias, key, sql, params, total = self.queue.get()
+            connection = connections[alias]
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'{explain_prefix(connection)} {sql}', params
+                    )
+                    plan = '\n'.join(
+                        ' '.join(str(column) for column in row)
+                        for row in cursor.fetchall()
+                    )
+            except Exception as error:
+                plan = f'EXPLAIN failed: {error}'
+            finally:
+                connection.close()
+            logger.warning(json.dumps({
+                'type': 'explain',
+                'fingerprint': key,
+                'total_ms': round(total * 1000, 1),
+                'plan': plan,
+            }, ensure_ascii=False))
+
+
+class SlowQueryLogger:
+    """Обёртка execute_wrapper, записывающая медленные запросы."""
+
+    def __init__(self, request, threshold, explain_worker):
+        self.request = request
+        self.threshold = threshold
+        self.explain_worker = explain_worker
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if duration >= self.threshold:
+                self.log(
+                    context['connection'].alias, sql, params, many, duration
+                )
+
+    def log(self, alias, sql, params, many, duration):
+        shape = normalize(sql)
+        key = fingerprint(shape)
+        logger.warning(json.dumps({
+            'type': 'query',
+            'fingerprint': key,
+            'sql': shape,
+            'duration_ms': round(duration * 1000, 1),
+            'route': getattr(
+                self.request.resolver_match, 'view_name', self.request.path
+            ),
+            'origin': find_query_origin(),
+            'alias': alias,
+        }, ensure_ascii=False))
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.explain_worker.submit(alias, key, sql, params, duration)
+
+
+class SlowQueryMiddleware(InstrumentationMiddleware):
+    """Middleware журнала медленных запросов."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.threshold = settings.SLOW_QUERY_THRESHOLD / 1000
+        self.explain_worker = ExplainWorker(settings.SLOW_QUERY_EXPLAIN_LIMIT)
+
+    def start(self, request):
+        if not self.threshold:
+            return None
+        return SlowQueryLogger(request, self.threshold, self.explain_worker)
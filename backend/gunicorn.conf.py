@@ -0,0 +1,66 @@
+"""
+Настройки gunicorn.
+
+Запуск: gunicorn foodgram.wsgi:application -c gunicorn.conf.py
+Любой параметр можно переопределить переменной окружения GUNICORN_*.
+"""
+import multiprocessing
+import os
+import shutil
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = os.getenv('GUNICORN_BIND', default='0.0.0.0:8000')
+
+# gthread: пока один поток ждёт БД, остальные потоки воркера
+# обслуживают другие запросы. Число потоков, как и число воркеров,
+# растёт с числом ядер.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', default='gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', default=cpu_count + 1))
+threads = int(os.getenv('GUNICORN_THREADS', default=cpu_count * 2))
+
+# Код приложения загружается в мастер-процессе до fork и делится
+# между воркерами по принципу copy-on-write.
+preload_app = os.getenv('GUNICORN_PRELOAD', default='True') == 'True'
+
+# Перезапуск воркера после max_requests запросов (со случайным
+# разбросом, чтобы воркеры не перезапускались одновременно)
+# ограничивает рост памяти.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', default=1000))
+max_requests_jitter = int(
+    os.getenv('GUNICORN_MAX_REQUESTS_JITTER', default=100)
+)
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    """Очистка файлов метрик Prometheus от предыдущего запуска."""
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def post_fork(server, worker):
+    """Воркер не должен использовать соединения с БД мастер-процесса."""
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    """Прогрев воркера в фоне после загрузки приложения (api.warmup)."""
+    from api.warmup import start_warm_up
+
+    start_warm_up()
+
+
+def child_exit(server, worker):
+    """Удаление метрик завершившегося воркера из общих счётчиков."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
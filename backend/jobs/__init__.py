@@ -0,0 +1 @@
+"""Файл инициализации приложения jobs."""
@@ -0,0 +1,28 @@
+"""Файл админки для приложения jobs."""
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Настройка панели фоновых задач."""
+
+    list_display = (
+        'id', 'name', 'status', 'attempts', 'max_attempts', 'run_at',
+        'locked_by',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    readonly_fields = ('created', 'locked_at', 'locked_by', 'last_error')
+    show_full_result_count = False
+    actions = ('requeue',)
+
+    @admin.action(description='Вернуть в очередь')
+    def requeue(self, request, queryset):
+        """Повторный запуск задач, например из статуса dead."""
+        queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+            locked_by='', locked_at=None,
+        )
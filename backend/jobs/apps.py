@@ -0,0 +1,14 @@
+"""Конфиг приложения jobs."""
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    """Конфиг приложения фоновых задач."""
+
+    name = 'jobs'
+    verbose_name = 'Фоновые задачи'
+
+    def ready(self):
+        """Регистрация задач из модулей tasks установленных приложений."""
+        autodiscover_modules('tasks')
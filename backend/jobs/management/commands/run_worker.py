@@ -0,0 +1,72 @@
+"""Команда запуска воркера фоновых задач."""
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import Worker
+
+
+def run_process(threads, poll_interval, burst):
+    """Воркер в отдельном процессе."""
+    worker = Worker(threads, poll_interval)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run(burst)
+
+
+class Command(BaseCommand):
+    """
+    Воркер очереди фоновых задач (приложение jobs).
+
+    Запускает --processes процессов по --threads потоков.
+    По SIGTERM или Ctrl+C воркеры перестают брать новые задачи
+    и дожидаются завершения текущих.
+    """
+
+    help = 'Запускает воркер фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов воркера.'
+        )
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Число потоков в каждом процессе.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            help='Пауза (с) между проверками пустой очереди.'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выполнить готовые задачи и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        arguments = (
+            options['threads'], options['poll_interval'], options['burst']
+        )
+        if options['processes'] == 1:
+            run_process(*arguments)
+            return
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=run_process, args=arguments)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def stop(*args):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for process in processes:
+            process.join()
@@ -0,0 +1 @@
+"""Файл инициализации для миграций."""
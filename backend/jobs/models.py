@@ -0,0 +1,56 @@
+"""Модели для приложения jobs."""
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Фоновая задача в очереди.
+
+    Выполненные задачи удаляются, задачи, исчерпавшие попытки,
+    остаются со статусом dead для разбора.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DEAD = 'dead'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DEAD, 'Не выполнена'),
+    )
+
+    name = models.CharField('Задача', max_length=255)
+    payload = models.JSONField('Аргументы', default=dict, blank=True)
+    status = models.CharField(
+        'Статус', max_length=16, choices=STATUSES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Максимум попыток')
+    run_at = models.DateTimeField('Выполнить после', default=timezone.now)
+    locked_by = models.CharField('Воркер', max_length=255, blank=True)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        """Мета для фоновой задачи."""
+
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = (
+            models.Index(
+                fields=('run_at',),
+                condition=models.Q(status='queued'),
+                name='job_queued_run_at',
+            ),
+            models.Index(
+                fields=('locked_at',),
+                condition=models.Q(status='running'),
+                name='job_running_locked_at',
+            ),
+        )
+
+    def __str__(self):
+        """Метод вывода в строковый формат фоновой задачи."""
+        return f'{self.name} #{self.pk} ({self.status})'
@@ -0,0 +1,55 @@
+"""
+Регистрация и постановка фоновых задач.
+
+Задача - функция, помеченная декоратором task в модуле tasks
+приложения. Аргументы задачи передаются именованными и хранятся
+в JSON, поэтому должны сериализоваться в JSON.
+
+enqueue() создаёт строку Job в текущей транзакции: задача появится
+в очереди только вместе с данными, ради которых поставлена,
+а при откате транзакции исчезнет вместе с ними.
+"""
+from django.conf import settings
+
+from .models import Job
+
+tasks = {}
+
+
+class UnknownTask(LookupError):
+    """Задача с таким именем не зарегистрирована."""
+
+
+def task(name, max_attempts=None):
+    """
+    Регистрация функции как фоновой задачи name.
+
+    max_attempts - число попыток до статуса dead,
+    по умолчанию JOB_MAX_ATTEMPTS.
+    """
+    def decorator(function):
+        function.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        tasks[name] = function
+        return function
+    return decorator
+
+
+def get_task(name):
+    """Функция задачи по имени."""
+    try:
+        return tasks[name]
+    except KeyError as error:
+        raise UnknownTask(f'Задача {name} не зарегистрирована.') from error
+
+
+def enqueue(name, run_at=None, **payload):
+    """Постановка задачи name с аргументами payload в очередь."""
+    job = Job(
+        name=name,
+        payload=payload,
+        max_attempts=get_task(name).max_attempts,
+    )
+    if run_at is not None:
+        job.run_at = run_at
+    job.save()
+    return job
@@ -0,0 +1,153 @@
+"""
+Воркер фоновых задач.
+
+Задачи забираются из таблицы Job запросом SELECT ... FOR UPDATE
+SKIP LOCKED: несколько воркеров (процессов и машин) не ждут
+друг друга и не получают одну задачу дважды. На SQLite
+блокировки строк нет, и там нужен один процесс воркера.
+
+Упавшая задача возвращается в очередь с экспоненциальной задержкой
+и случайным разбросом, после max_attempts попыток получает
+статус dead. Задачи воркера, который завис или был убит, через
+JOB_LOCK_TIMEOUT секунд снова попадают в очередь.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import F
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from .models import Job
+from .queue import get_task
+
+logger = logging.getLogger('jobs')
+
+
+def backoff(attempt):
+    """Задержка (с) перед попыткой attempt + 1."""
+    delay = min(
+        settings.JOB_BACKOFF_BASE * 2 ** (attempt - 1),
+        settings.JOB_BACKOFF_MAX
+    )
+    return random.uniform(delay / 2, delay)
+
+
+def claim(worker, limit):
+    """Не больше limit готовых к выполнению задач для воркера worker."""
+    now = timezone.now()
+    with atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True).filter(
+                status=Job.QUEUED, run_at__lte=now
+            ).order_by('run_at').values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(
+        id__in=ids, status=Job.RUNNING, locked_by=worker, locked_at=now
+    ))
+
+
+def fail(job, error):
+    """Повтор задачи с задержкой или статус dead."""
+    if job.attempts >= job.max_attempts:
+        changes = {'status': Job.DEAD}
+        logger.error('Задача %s исчерпала попытки:\n%s', job, error)
+    else:
+        changes = {
+            'status': Job.QUEUED,
+            'run_at': timezone.now() + timedelta(
+                seconds=backoff(job.attempts)
+            ),
+        }
+        logger.warning('Задача %s упала, повтор:\n%s', job, error)
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        locked_by='', locked_at=None, last_error=error, **changes
+    )
+
+
+def execute(job):
+    """Выполнение задачи. Успешно выполненная задача удаляется."""
+    try:
+        get_task(job.name)(**job.payload)
+    except Exception:
+        fail(job, traceback.format_exc())
+    else:
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+    finally:
+        close_old_connections()
+
+
+def requeue_stale():
+    """Возврат в очередь задач зависших или убитых воркеров."""
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(
+            seconds=settings.JOB_LOCK_TIMEOUT
+        ),
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.DEAD, locked_by='', locked_at=None,
+        last_error='Воркер не завершил задачу за JOB_LOCK_TIMEOUT.',
+    )
+    stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+class Worker:
+    """Цикл выборки задач с пулом из threads потоков."""
+
+    def __init__(self, threads=1, poll_interval=None):
+        self.threads = threads
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+
+    def stop(self, *args):
+        """Остановка после завершения текущих задач."""
+        self.stopping.set()
+
+    def run(self, burst=False):
+        """
+        Выборка и выполнение задач до вызова stop().
+
+        С burst=True воркер завершается, когда готовых задач
+        не осталось.
+        """
+        logger.info('Воркер %s запущен, потоков: %s', self.name, self.threads)
+        running = set()
+        with ThreadPoolExecutor(self.threads) as pool:
+            while not self.stopping.is_set():
+                running = {future for future in running if not future.done()}
+                free = self.threads - len(running)
+                try:
+                    requeue_stale()
+                    jobs = claim(self.name, free) if free else []
+                except DatabaseError:
+                    logger.exception('Воркер %s: ошибка БД', self.name)
+                    close_old_connections()
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                running.update(pool.submit(execute, job) for job in jobs)
+                if jobs:
+                    continue
+                if burst and not running:
+                    break
+                if running:
+                    wait(running, self.poll_interval, FIRST_COMPLETED)
+                else:
+                    self.stopping.wait(self.poll_interval)
+        close_old_connections()
+        logger.info('Воркер %s остановлен', self.name)
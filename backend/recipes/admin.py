@@ -1,19 +1,59 @@
 """Файл админки для приложения recipes."""
 
 from django.contrib import admin
+from django.db.models import Count
+from django.db.transaction import atomic
 from django.utils.html import format_html
 
 from .models import (Favorite, Ingredient, IngredientQuantity, Recipe,
                      ShoppingCart, Tag, User)
+from api.read_models import deferred_rebuild
 
 
 class BaseAdminSettings(admin.ModelAdmin):
-    """Настройки панели администартора."""
+    """
+    Настройки панели администартора.
+
+    Сохранение формы со строками inline и удаление с каскадом
+    меняют много строк, и каждая пересобирала бы представление
+    рецепта (api.read_models). Внутри deferred_rebuild() каждый
+    затронутый рецепт пересобирается один раз в той же транзакции.
+    """
 
     empty_value_display = '-пусто-'
 
+    def changeform_view(self, *args, **kwargs):
+        with atomic(), deferred_rebuild():
+            return super().changeform_view(*args, **kwargs)
+
+    def delete_model(self, request, obj):
+        with atomic(), deferred_rebuild():
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with atomic(), deferred_rebuild():
+            super().delete_queryset(request, queryset)
+
+
+class LargeTableAdmin(BaseAdminSettings):
+    """
+    Настройки панели для больших таблиц.
+
+    Без полного COUNT(*) по таблице при поиске и фильтрации,
+    связанные объекты выбираются через автодополнение.
+    """
+
+    show_full_result_count = False
+
+
+class UserAdmin(LargeTableAdmin):
+    """Настройка панели пользователей."""
+
+    list_display = ('username', 'email', 'first_name', 'last_name')
+    search_fields = ('username', 'email')
+
 
-class IngredientAdmin(BaseAdminSettings):
+class IngredientAdmin(LargeTableAdmin):
     """Настройка панели ингредиентов."""
 
     list_display = (
@@ -21,8 +61,7 @@ class IngredientAdmin(BaseAdminSettings):
         'measurement_unit'
     )
     list_display_links = ('name',)
-    search_fields = ('name',)
-    list_filter = ('name',)
+    search_fields = ('^name',)
     empty_value_display = '-0-'
 
 
@@ -35,6 +74,11 @@ class IngredientQuantityInLine(admin.TabularInline):
     model = IngredientQuantity
     extra = 0
     min_num = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        """Ингредиенты строк выбираются тем же запросом."""
+        return super().get_queryset(request).select_related('ingredient')
 
 
 class TagAdmin(BaseAdminSettings):
@@ -59,39 +103,53 @@ class TagAdmin(BaseAdminSettings):
     colored.short_description = 'цвет'
 
 
-class RecipeAdmin(BaseAdminSettings):
+class RecipeAdmin(LargeTableAdmin):
     """Настройка панели рецептов."""
 
     list_display = (
         'name', 'author', 'text',
-        'cooking_time', 'id', 'image',
+        'cooking_time', 'id', 'image', 'favorites_count',
     )
     list_display_links = ('name',)
-    search_fields = ('name', 'author', 'tags')
-    list_filter = ('author', 'name', 'tags')
+    list_select_related = ('author',)
+    search_fields = ('name', 'author__username', 'author__email')
+    list_filter = ('tags',)
+    autocomplete_fields = ('author',)
     filter_horizontal = ('tags',)
     inlines = (IngredientQuantityInLine,)
-    exclude = ('ingredients', )
     empty_value_display = '-0-'
 
+    def get_queryset(self, request):
+        """Число добавлений в избранное считается в том же запросе."""
+        return super().get_queryset(request).annotate(
+            favorites_count=Count('favorite_recipe')
+        )
+
+    @admin.display(description='в избранном', ordering='favorites_count')
+    def favorites_count(self, obj):
+        """Число пользователей, добавивших рецепт в избранное."""
+        return obj.favorites_count
+
 
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdmin):
     """Настройка панели избранное."""
 
     list_display = ('user', 'recipe')
-    list_filter = ('user', 'recipe')
-    search_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'user__email', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
 
 
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdmin):
     """Настройка панели корзины."""
 
     list_display = ('recipe', 'user')
-    list_filter = ('recipe', 'user')
-    search_fields = ('user',)
+    list_select_related = ('recipe', 'user')
+    search_fields = ('user__username', 'user__email', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
 
 
-admin.site.register(User, BaseAdminSettings)
+admin.site.register(User, UserAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Recipe, RecipeAdmin)
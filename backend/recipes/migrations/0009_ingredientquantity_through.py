@@ -0,0 +1,79 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_unsynced_links(apps, schema_editor):
+    """
+    Перенос связей, которые есть только в таблице recipe_ingredients.
+
+    Основной источник данных - IngredientQuantity.current_recipe.
+    Если старая таблица связывает рецепт с количеством ингредиента
+    другого рецепта, для рецепта создаётся своё количество.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientQuantity = apps.get_model('recipes', 'IngredientQuantity')
+    Link = Recipe.ingredients.through
+    existing = set(
+        IngredientQuantity.objects.values_list(
+            'current_recipe_id', 'ingredient_id'
+        )
+    )
+    missing = []
+    for recipe_id, ingredient_id, amount in Link.objects.exclude(
+        ingredientquantity__current_recipe_id=models.F('recipe_id')
+    ).values_list(
+        'recipe_id',
+        'ingredientquantity__ingredient_id',
+        'ingredientquantity__amount',
+    ):
+        if (recipe_id, ingredient_id) in existing:
+            continue
+        existing.add((recipe_id, ingredient_id))
+        missing.append(IngredientQuantity(
+            current_recipe_id=recipe_id,
+            ingredient_id=ingredient_id,
+            amount=amount,
+        ))
+    IngredientQuantity.objects.bulk_create(missing, batch_size=1000)
+
+
+def restore_links(apps, schema_editor):
+    """Заполнение таблицы recipe_ingredients при откате."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientQuantity = apps.get_model('recipes', 'IngredientQuantity')
+    Link = Recipe.ingredients.through
+    Link.objects.bulk_create(
+        [
+            Link(recipe_id=recipe_id, ingredientquantity_id=pk)
+            for pk, recipe_id in IngredientQuantity.objects.values_list(
+                'id', 'current_recipe_id'
+            )
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_alter_ingredientquantity_amount'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_unsynced_links, restore_links),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='ingredients',
+        ),
+        migrations.AlterField(
+            model_name='ingredientquantity',
+            name='current_recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_quantities', to='recipes.recipe'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(help_text='Выберите ингредиенты для рецепта', related_name='recipes', through='recipes.IngredientQuantity', to='recipes.Ingredient', verbose_name='Ингредиенты'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-19 08:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_ingredientquantity_through'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeReadModel',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='read_model', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('data', models.JSONField(verbose_name='Представление рецепта')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Представление рецепта',
+            },
+        ),
+    ]
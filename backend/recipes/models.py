@@ -46,7 +46,7 @@ class IngredientQuantity(models.Model):
     current_recipe = models.ForeignKey(
         'Recipe',
         on_delete=models.CASCADE,
-        related_name='+'
+        related_name='ingredient_quantities'
     )
     amount = models.PositiveSmallIntegerField(
         verbose_name='Количество ингредиента',
@@ -153,8 +153,9 @@ class Recipe(models.Model):
         )
     )
     ingredients = models.ManyToManyField(
-        IngredientQuantity,
-        symmetrical=False,
+        Ingredient,
+        through=IngredientQuantity,
+        related_name='recipes',
         verbose_name='Ингредиенты',
         help_text='Выберите ингредиенты для рецепта'
     )
@@ -235,3 +236,32 @@ class ShoppingCart(models.Model):
     def __str__(self):
         """Метод вывода в строковый формат списка покупок."""
         return f'Рецепт {self.recipe} в списке у {self.user}'
+
+
+class RecipeReadModel(models.Model):
+    """
+    Готовое представление рецепта для чтения.
+
+    Хранит ответ ListRecipeSerializer для анонимного пользователя,
+    флаги текущего пользователя добавляются при чтении.
+    Пересобирается из api.read_models.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='read_model',
+        verbose_name='Рецепт',
+    )
+    data = models.JSONField('Представление рецепта')
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        """Мета для представления рецепта."""
+
+        verbose_name = 'Представление рецепта'
+
+    def __str__(self):
+        """Метод вывода в строковый формат представления рецепта."""
+        return f'Представление рецепта {self.recipe_id}'
@@ -0,0 +1,120 @@
+from importlib import reload
+
+import pytest
+from django.db import connection
+from django.urls import clear_url_caches
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+import api.urls
+import foodgram.urls
+from recipes.models import Ingredient, IngredientQuantity, Recipe, Tag, User
+
+IMAGE = 'recipes/media/test.png'
+
+
+def pytest_collection_modifyitems(config, items):
+    """Тесты с меткой postgresql пропускаются на других СУБД."""
+    if connection.vendor == 'postgresql':
+        return
+    skip = pytest.mark.skip(reason='нужен PostgreSQL')
+    for item in items:
+        if 'postgresql' in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+def primary_only(request, settings):
+    """
+    Чтение из основной БД, кроме тестов с меткой replicas.
+
+    Зеркало replica1 - отдельное соединение: оно не видит данных
+    из незакоммиченной транзакции теста.
+    """
+    if 'replicas' not in request.keywords:
+        settings.DATABASE_REPLICAS = []
+
+
+def reload_urls():
+    # Вложенный URLResolver корневого urlconf кэширует маршруты api.urls.
+    reload(api.urls)
+    reload(foodgram.urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_read_views(settings):
+    """Маршруты API как под ASGI: эндпоинты чтения - асинхронные вьюхи."""
+    enabled = settings.ASYNC_READ_VIEWS
+    settings.ASYNC_READ_VIEWS = True
+    reload_urls()
+    yield
+    settings.ASYNC_READ_VIEWS = enabled
+    reload_urls()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(
+        username='user', email='user@example.com', password='pass12345!',
+        first_name='Имя', last_name='Фамилия',
+    )
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(
+        username='author', email='author@example.com',
+        password='pass12345!', first_name='Автор', last_name='Рецептов',
+    )
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+@pytest.fixture
+def user_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(name='Обед', slug='lunch', color='#00FF00'),
+        Tag.objects.create(name='Завтрак', slug='breakfast', color='#FF0000'),
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(name=f'Ингредиент {number}',
+                                  measurement_unit='г')
+        for number in range(3)
+    ]
+
+
+def create_recipe(author, tags, ingredients, name='Рецепт'):
+    recipe = Recipe.objects.create(
+        author=author, name=name, text='Описание рецепта',
+        cooking_time=10, image=IMAGE,
+    )
+    recipe.tags.set(tags)
+    for amount, ingredient in enumerate(ingredients, 1):
+        IngredientQuantity.objects.create(
+            current_recipe=recipe, ingredient=ingredient, amount=amount * 10
+        )
+    return recipe
+
+
+@pytest.fixture
+def recipes(author, tags, ingredients):
+    return [
+        create_recipe(author, tags, ingredients, 'Суп'),
+        create_recipe(author, tags[:1], ingredients[1:], 'Каша'),
+        create_recipe(author, [], [], 'Чай'),
+    ]
@@ -0,0 +1,55 @@
+import asyncio
+import re
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.response import Response
+
+from api.views import TagViewSet
+from recipes.models import Favorite, Tag
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@async_to_sync
+async def asgi_post(path, token):
+    return await AsyncClient().post(
+        path, authorization=f'Token {token.key}'
+    )
+
+
+def queries(response):
+    return int(re.search(r'"(\d+) queries"', response['Server-Timing'])[1])
+
+
+def test_asgi_write_route_records_queries(settings, token, recipes):
+    settings.PROFILING_SAMPLE_RATE = 1
+    response = asgi_post(f'/api/recipes/{recipes[0].id}/favorite/', token)
+    assert response.status_code == 201
+    assert Favorite.objects.filter(recipe=recipes[0]).exists()
+    assert queries(response) > 0
+
+
+@async_to_sync
+async def asgi_get_many(path, count):
+    client = AsyncClient()
+    return await asyncio.gather(*(client.get(path) for _ in range(count)))
+
+
+def test_asgi_read_requests_run_concurrently(settings, monkeypatch,
+                                             async_read_views):
+    settings.PROFILING_SAMPLE_RATE = 1
+
+    def slow_list(self, request):
+        time.sleep(0.3)
+        return Response({'count': Tag.objects.count()})
+
+    monkeypatch.setattr(TagViewSet, 'list', slow_list)
+    started = time.perf_counter()
+    responses = asgi_get_many('/api/tags/', 4)
+    elapsed = time.perf_counter() - started
+    assert [response.status_code for response in responses] == [200] * 4
+    assert [queries(response) for response in responses] == [1] * 4
+    assert elapsed < 0.9
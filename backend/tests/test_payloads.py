@@ -0,0 +1,38 @@
+import pytest
+from django.core.cache import cache
+
+from recipes.models import Tag
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def get_tags(client, **headers):
+    return client.get('/api/tags/', HTTP_ACCEPT_ENCODING='gzip', **headers)
+
+
+def test_etag_depends_only_on_content(client, tags):
+    etag = get_tags(client)['ETag']
+    # Другой воркер или истёкший кэш собирают то же тело заново.
+    cache.clear()
+    assert get_tags(client)['ETag'] == etag
+    response = get_tags(client, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+def test_etag_changes_after_commit(client, tags,
+                                   django_capture_on_commit_callbacks):
+    etag = get_tags(client)['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        Tag.objects.filter(pk=tags[0].pk).first().save()
+    assert get_tags(client)['ETag'] == etag
+    with django_capture_on_commit_callbacks(execute=True):
+        tags[0].name = 'Ужин'
+        tags[0].save()
+    response = get_tags(client, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
@@ -0,0 +1,47 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer
+from api.representations import RECIPE_FIELDS, recipe_detail, recipe_list
+from recipes.models import Favorite, Recipe, RecipeReadModel, ShoppingCart
+from users.models import Subscribe
+
+pytestmark = [pytest.mark.postgresql, pytest.mark.django_db]
+
+
+def make_request(user):
+    request = Request(APIRequestFactory().get('/api/recipes/'))
+    request.user = user
+    return request
+
+
+def orm_detail(pk, request):
+    """Тот же рецепт через recipe_list (путь для остальных СУБД)."""
+    rows = list(Recipe.objects.filter(pk=pk).values(*RECIPE_FIELDS))
+    return recipe_list(rows, request)[0]
+
+
+@pytest.mark.parametrize('authenticated', (False, True))
+def test_sql_detail_matches_orm(authenticated, user, author, recipes):
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=user, recipe=recipes[0])
+    Subscribe.objects.create(following=user, author=author)
+    request = make_request(user if authenticated else AnonymousUser())
+    renderer = FastJSONRenderer()
+    for recipe in recipes:
+        assert renderer.render(recipe_detail(recipe.id, request)) == (
+            renderer.render(orm_detail(recipe.id, request))
+        )
+
+
+def test_sql_detail_missing_recipe(user):
+    assert recipe_detail(0, make_request(user)) is None
+
+
+def test_retrieve_without_read_model_uses_sql(user_client, recipes):
+    recipe = recipes[0]
+    expected = user_client.get(f'/api/recipes/{recipe.id}/').json()
+    RecipeReadModel.objects.filter(recipe=recipe).delete()
+    assert user_client.get(f'/api/recipes/{recipe.id}/').json() == expected
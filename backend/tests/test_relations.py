@@ -0,0 +1,74 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+
+from api.serializers import RecipeShortShowSerializer, SubscribeSerializer
+from api.views import ALREADY_ADDED, ALREADY_SUBSCRIBED
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscribe
+
+pytestmark = [pytest.mark.postgresql, pytest.mark.django_db]
+
+
+def table_queries(queries, model):
+    return [
+        query['sql'] for query in queries
+        if model._meta.db_table in query['sql']
+    ]
+
+
+@pytest.mark.parametrize(
+    'target, model', [('favorite', Favorite), ('shopping_cart', ShoppingCart)]
+)
+def test_add_recipe_in_one_query(user_client, recipes, target, model):
+    recipe = recipes[0]
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.post(f'/api/recipes/{recipe.id}/{target}/')
+    assert response.status_code == 201
+    [insert] = table_queries(queries, Recipe)
+    assert insert.lstrip().startswith('WITH added AS (')
+    assert model.objects.filter(recipe=recipe).exists()
+    expected = RecipeShortShowSerializer(
+        recipe, context={'request': response.wsgi_request}
+    ).data
+    assert list(response.json().items()) == list(expected.items())
+
+
+@pytest.mark.parametrize(
+    'target, model', [('favorite', Favorite), ('shopping_cart', ShoppingCart)]
+)
+def test_add_recipe_failures(user_client, recipes, target, model):
+    path = f'/api/recipes/{recipes[0].id}/{target}/'
+    assert user_client.post(path).status_code == 201
+    response = user_client.post(path)
+    assert response.status_code == 400
+    assert response.json() == {'errors': ALREADY_ADDED[model]}
+    assert user_client.post(f'/api/recipes/0/{target}/').status_code == 404
+    assert user_client.post(f'/api/recipes/x/{target}/').status_code == 404
+
+
+def test_subscribe_in_one_query(user_client, user, author, recipes):
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.post(f'/api/users/{author.id}/subscribe/')
+    assert response.status_code == 201
+    [insert] = table_queries(queries, Subscribe)
+    assert insert.lstrip().startswith('WITH added AS (')
+    assert Subscribe.objects.filter(following=user, author=author).exists()
+    request = Request(response.wsgi_request)
+    request.user = user
+    expected = SubscribeSerializer(author, context={'request': request}).data
+    assert response.json() == expected
+    assert list(response.json()) == list(expected)
+
+
+def test_subscribe_failures(user_client, user, author):
+    path = f'/api/users/{author.id}/subscribe/'
+    assert user_client.post(path).status_code == 201
+    response = user_client.post(path)
+    assert response.status_code == 400
+    assert response.json() == {'errors': ALREADY_SUBSCRIBED}
+    assert user_client.post(
+        f'/api/users/{user.id}/subscribe/'
+    ).status_code == 400
+    assert user_client.post('/api/users/0/subscribe/').status_code == 404
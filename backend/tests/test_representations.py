@@ -0,0 +1,143 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.read_models import read_recipe, read_recipe_list
+from api.renderers import FastJSONRenderer
+from api.representations import (RECIPE_COMPACT_FIELDS, RECIPE_FIELDS,
+                                 USER_FIELDS, ingredient_list, recipe_detail,
+                                 recipe_list, subscription_list)
+from api.serializers import (IngredientSerializer, ListRecipeSerializer,
+                             SubscribeSerializer)
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeReadModel,
+                            ShoppingCart, User)
+from tests.conftest import create_recipe
+from users.models import Subscribe
+
+pytestmark = pytest.mark.django_db
+
+
+def render(data):
+    return FastJSONRenderer().render(data)
+
+
+def make_request(user=None, **params):
+    request = Request(APIRequestFactory().get('/api/recipes/', params))
+    request.user = user or AnonymousUser()
+    return request
+
+
+@pytest.fixture
+def user_lists(user, author, recipes):
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=user, recipe=recipes[1])
+    Subscribe.objects.create(following=user, author=author)
+
+
+@pytest.fixture(params=('anonymous', 'authenticated'))
+def request_user(request, user, user_lists):
+    return None if request.param == 'anonymous' else user
+
+
+def serialized(recipes, request, many=True):
+    return render(ListRecipeSerializer(
+        recipes, many=many, context={'request': request}
+    ).data)
+
+
+def test_recipe_list_matches_serializer(request_user, recipes):
+    request = make_request(request_user)
+    queryset = Recipe.objects.all()
+    assert render(
+        recipe_list(list(queryset.values(*RECIPE_FIELDS)), request)
+    ) == serialized(queryset, request)
+
+
+def test_recipe_detail_matches_serializer(request_user, recipes):
+    request = make_request(request_user)
+    for recipe in recipes:
+        assert render(recipe_detail(recipe.id, request)) == serialized(
+            recipe, request, many=False
+        )
+
+
+def test_read_model_list_matches_serializer(request_user, recipes):
+    request = make_request(request_user)
+    queryset = Recipe.objects.all()
+    ids = list(queryset.values_list('id', flat=True))
+    assert RecipeReadModel.objects.count() == len(recipes)
+    assert render(read_recipe_list(ids, request)) == serialized(
+        queryset, request
+    )
+
+
+def test_read_model_list_without_read_models(request_user, recipes):
+    RecipeReadModel.objects.filter(recipe=recipes[1]).delete()
+    request = make_request(request_user)
+    queryset = Recipe.objects.all()
+    ids = list(queryset.values_list('id', flat=True))
+    assert render(read_recipe_list(ids, request)) == serialized(
+        queryset, request
+    )
+
+
+def test_compact_list_reads_only_needed_keys(request_user, author, tags,
+                                            recipes):
+    number = create_recipe(author, tags, [], name='42')
+    request = make_request(request_user)
+    ids = list(Recipe.objects.values_list('id', flat=True))
+    with CaptureQueriesContext(connection) as queries:
+        compact = read_recipe_list(ids, request, RECIPE_COMPACT_FIELDS)
+    assert len(queries) == 1
+    sql = queries[0]['sql']
+    assert "'cooking_time'" in sql
+    assert "'text'" not in sql
+    assert "'ingredients'" not in sql
+    assert compact == [
+        {field: recipe[field] for field in RECIPE_COMPACT_FIELDS}
+        for recipe in read_recipe_list(ids, request)
+    ]
+    assert {recipe['id']: recipe for recipe in compact}[number.id][
+        'name'
+    ] == '42'
+
+
+def test_read_model_detail_matches_serializer(request_user, recipes):
+    request = make_request(request_user)
+    for recipe in recipes:
+        assert render(read_recipe(recipe.id, request)) == serialized(
+            recipe, request, many=False
+        )
+
+
+def test_user_flags(user, recipes, user_lists):
+    recipe = read_recipe(recipes[0].id, make_request(user))
+    assert recipe['is_favorited'] is True
+    assert recipe['is_in_shopping_cart'] is False
+    assert recipe['author']['is_subscribed'] is True
+    anonymous = read_recipe(recipes[0].id, make_request())
+    assert anonymous['is_favorited'] is False
+    assert anonymous['author']['is_subscribed'] is False
+
+
+@pytest.mark.parametrize('recipes_limit', (None, 1))
+def test_subscription_list_matches_serializer(user, user_lists,
+                                              recipes_limit):
+    params = {'recipes_limit': recipes_limit} if recipes_limit else {}
+    request = make_request(user, **params)
+    authors = User.objects.filter(following__following=user)
+    assert render(
+        subscription_list(list(authors.values(*USER_FIELDS)), request)
+    ) == render(SubscribeSerializer(
+        authors, many=True, context={'request': request}
+    ).data)
+
+
+def test_ingredient_list_matches_serializer(ingredients):
+    queryset = Ingredient.objects.all()
+    assert render(ingredient_list(queryset)) == render(
+        IngredientSerializer(queryset, many=True).data
+    )
@@ -0,0 +1,127 @@
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from foodgram.routers import PIN_COOKIE, PRIMARY, PrimaryReplicaRouter
+from recipes.models import Favorite, Recipe
+
+REPLICA = 'replica1'
+
+pytestmark = [
+    pytest.mark.replicas,
+    pytest.mark.django_db(transaction=True, databases='__all__'),
+]
+
+
+class Queries:
+    """SQL-запросы к основной БД и реплике за время блока."""
+
+    def __enter__(self):
+        self.contexts = {
+            alias: CaptureQueriesContext(connections[alias])
+            for alias in (PRIMARY, REPLICA)
+        }
+        for context in self.contexts.values():
+            context.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        for context in self.contexts.values():
+            context.__exit__(*args)
+
+    def __getitem__(self, alias):
+        return [query['sql'] for query in self.contexts[alias]]
+
+
+def test_router_writes_and_migrates_only_primary():
+    router = PrimaryReplicaRouter()
+    assert router.db_for_write(Recipe) == PRIMARY
+    assert router.db_for_read(Recipe) == PRIMARY
+    assert router.allow_migrate(PRIMARY, 'recipes')
+    assert not router.allow_migrate(REPLICA, 'recipes')
+
+
+def test_reads_go_to_replica(recipes):
+    with Queries() as queries:
+        response = APIClient().get('/api/recipes/')
+    assert response.status_code == 200
+    assert response.json()['count'] == len(recipes)
+    assert queries[REPLICA]
+    assert not queries[PRIMARY]
+
+
+def test_writes_go_to_primary(user_client, recipes):
+    with Queries() as queries:
+        response = user_client.post(f'/api/recipes/{recipes[0].id}/favorite/')
+    assert response.status_code == 201
+    assert Favorite.objects.filter(recipe=recipes[0]).exists()
+    assert any('INSERT INTO' in sql for sql in queries[PRIMARY])
+    assert not queries[REPLICA]
+
+
+def test_browser_pinned_to_primary_after_write(user_client, recipes):
+    response = user_client.post(f'/api/recipes/{recipes[0].id}/favorite/')
+    assert PIN_COOKIE in response.cookies
+    with Queries() as queries:
+        response = user_client.get('/api/recipes/?is_favorited=1')
+    assert response.json()['count'] == 1
+    assert queries[PRIMARY]
+    assert not queries[REPLICA]
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    settings.CACHES = {
+        **settings.CACHES,
+        'pins': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        },
+    }
+    settings.REPLICA_PIN_CACHE_ALIAS = 'pins'
+
+
+def token_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def test_api_client_pinned_through_shared_cache(shared_cache, token,
+                                                recipes):
+    # Запись и чтение - разными клиентами без общих cookie,
+    # как два запроса в разные воркеры.
+    response = token_client(token).post(
+        f'/api/recipes/{recipes[0].id}/favorite/'
+    )
+    assert response.status_code == 201
+    with Queries() as queries:
+        response = token_client(token).get('/api/recipes/?is_favorited=1')
+    assert response.json()['count'] == 1
+    assert queries[PRIMARY]
+    assert not queries[REPLICA]
+
+
+def test_failed_write_does_not_pin(shared_cache, user_client):
+    response = user_client.post('/api/recipes/0/favorite/')
+    assert response.status_code == 404
+    assert PIN_COOKIE not in response.cookies
+    with Queries() as queries:
+        user_client.get('/api/recipes/')
+    assert queries[REPLICA]
+    assert not queries[PRIMARY]
+
+
+def test_api_client_not_pinned_before_write(shared_cache, token, recipes):
+    with Queries() as queries:
+        token_client(token).get('/api/recipes/')
+    assert queries[REPLICA]
+    assert not queries[PRIMARY]
+
+
+def test_api_client_reads_primary_with_process_local_cache(token, recipes):
+    with Queries() as queries:
+        token_client(token).get('/api/recipes/')
+    assert queries[PRIMARY]
+    assert not queries[REPLICA]
@@ -0,0 +1,29 @@
+from foodgram.slow_queries import ExplainWorker
+
+
+def explain(worker, key, duration):
+    if worker.track(key, duration):
+        worker.explained.add(key)
+        return True
+    return False
+
+
+def test_explains_slowest_shapes_by_total_time():
+    worker = ExplainWorker(limit=2)
+    assert explain(worker, 'a', 1.0)
+    assert explain(worker, 'b', 0.5)
+    assert not explain(worker, 'c', 0.1)
+    # Частый запрос обгоняет по суммарному времени и объясняется,
+    # хотя появился после исчерпания лимита.
+    results = [explain(worker, 'c', 0.1) for _ in range(9)]
+    assert results.count(True) == 1
+    assert not results[0]
+    assert not explain(worker, 'a', 1.0)
+
+
+def test_tracked_shapes_are_bounded():
+    worker = ExplainWorker(limit=1)
+    for number in range(100):
+        explain(worker, f'shape{number}', 0.2)
+    assert len(worker.totals) == ExplainWorker.TRACKED_FACTOR
+    assert worker.explained <= set(worker.totals)
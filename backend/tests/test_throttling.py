@@ -0,0 +1,50 @@
+import pytest
+
+from api.throttling import CounterRateThrottle, Overloaded, concurrency_slot
+
+
+class FourPerMinute(CounterRateThrottle):
+    rate = '4/min'
+
+    def get_cache_key(self, request, view):
+        return 'throttle_test'
+
+
+def allowed(count):
+    return sum(
+        FourPerMinute().allow_request(None, None) for _ in range(count)
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    yield
+    FourPerMinute().cache.clear()
+
+
+def test_process_local_counter_splits_limit_between_workers(settings):
+    settings.THROTTLE_WORKERS = 2
+    assert allowed(6) == 2
+
+
+def test_shared_counter_keeps_full_limit(settings, tmp_path):
+    settings.CACHES = {
+        **settings.CACHES,
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        },
+    }
+    settings.THROTTLE_CACHE_ALIAS = 'throttle'
+    settings.THROTTLE_WORKERS = 2
+    assert allowed(6) == 4
+
+
+def test_concurrency_slot_rejects_over_limit(settings):
+    settings.CONCURRENCY_LIMITS = {'throttle_test': 1}
+    with concurrency_slot('throttle_test'):
+        with pytest.raises(Overloaded):
+            with concurrency_slot('throttle_test'):
+                pass
+    with concurrency_slot('throttle_test'):
+        pass
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+from django.urls import resolve
+
+
+@pytest.mark.parametrize('path, name', [
+    ('/api/recipes/download_shopping_cart/', 'recipes-download-shopping-cart'),
+    ('/api/recipes/favorite/', 'recipes-favorite-batch'),
+    ('/api/recipes/shopping_cart/', 'recipes-shopping-cart-batch'),
+    ('/api/recipes/1/favorite/', 'recipes-favorite'),
+    ('/api/recipes/1/', 'recipes-detail'),
+])
+def test_routes_resolve_with_async_read_views(async_read_views, path, name):
+    assert resolve(path).url_name == name
+
+
+@pytest.mark.parametrize('path, is_async', [
+    ('/api/recipes/', True),
+    ('/api/recipes/1/', True),
+    ('/api/tags/', True),
+    ('/api/recipes/download_shopping_cart/', False),
+])
+def test_only_read_routes_are_async(async_read_views, path, is_async):
+    assert asyncio.iscoroutinefunction(resolve(path).func) is is_async
+
+
+@pytest.mark.django_db
+def test_list_actions_respond_with_async_read_views(async_read_views,
+                                                    user_client, recipes):
+    response = user_client.get('/api/recipes/download_shopping_cart/')
+    assert response.status_code == 200
+    for target in ('favorite', 'shopping_cart'):
+        response = user_client.post(
+            f'/api/recipes/{target}/', {'ids': [recipes[0].id]},
+            format='json'
+        )
+        assert response.status_code in (200, 201)
@@ -0,0 +1,84 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.views import ALREADY_ADDED, ALREADY_SUBSCRIBED
+from recipes.models import Favorite, RecipeReadModel, ShoppingCart
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize(
+    'target, model', [('favorite', Favorite), ('shopping_cart', ShoppingCart)]
+)
+def test_second_add_is_rejected(user_client, recipes, target, model):
+    path = f'/api/recipes/{recipes[0].id}/{target}/'
+    assert user_client.post(path).status_code == 201
+    response = user_client.post(path)
+    assert response.status_code == 400
+    assert response.json() == {'errors': ALREADY_ADDED[model]}
+    assert model.objects.filter(recipe=recipes[0]).count() == 1
+    assert user_client.post(f'/api/recipes/0/{target}/').status_code == 404
+
+
+def test_second_subscribe_is_rejected(user_client, author):
+    path = f'/api/users/{author.id}/subscribe/'
+    assert user_client.post(path).status_code == 201
+    response = user_client.post(path)
+    assert response.status_code == 400
+    assert response.json() == {'errors': ALREADY_SUBSCRIBED}
+
+
+@pytest.fixture
+def author_client(author):
+    client = APIClient()
+    client.force_authenticate(author)
+    return client
+
+
+def recipe_updates(queries):
+    return [
+        query['sql'] for query in queries
+        if query['sql'].startswith('UPDATE "recipes_recipe"')
+    ]
+
+
+def test_ingredient_change_does_not_rewrite_recipe_row(author_client,
+                                                       recipes, ingredients):
+    recipe = recipes[2]
+    with CaptureQueriesContext(connection) as queries:
+        response = author_client.patch(
+            f'/api/recipes/{recipe.id}/',
+            {'ingredients': [{'id': ingredients[0].id, 'amount': 5}]},
+            format='json',
+        )
+    assert response.status_code == 200
+    assert not recipe_updates(queries)
+    recipe.read_model.refresh_from_db()
+    assert [
+        (item['id'], item['amount'])
+        for item in recipe.read_model.data['ingredients']
+    ] == [(ingredients[0].id, 5)]
+
+
+def test_name_change_updates_only_changed_columns(author_client, recipes):
+    recipe = recipes[2]
+    with CaptureQueriesContext(connection) as queries:
+        response = author_client.patch(
+            f'/api/recipes/{recipe.id}/', {'name': 'Кофе'}, format='json'
+        )
+    assert response.status_code == 200
+    [update] = recipe_updates(queries)
+    assert '"text"' not in update
+    assert RecipeReadModel.objects.get(pk=recipe.pk).data['name'] == 'Кофе'
+
+
+@pytest.mark.parametrize('path', ['/api/users/', '/api/users/{id}/'])
+def test_head_users_matches_get(user_client, author, path):
+    path = path.format(id=author.id)
+    response = user_client.head(path)
+    assert response.status_code == 200
+    assert response['Content-Length'] == user_client.get(path)[
+        'Content-Length'
+    ]